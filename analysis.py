@@ -9,16 +9,32 @@
 # H. Arda Güler
 # - - - - - - - - - - - - - - - - - - - -
 import math
+import os
 import re
-import time
+from time import monotonic
 
+import numpy
+
+from cache import result_cache
+from checkpoint import load_checkpoint
+from checkpoint import save_checkpoint
+from config import config_from_params
+from config import param_names
+from ensemble import ensemble_solver
 from film_coeff import *
 from geometry import *
+from kernels import kernel_backends
 from mach import *
 from material import CuCrZr
 from material import Jet_A1
 from material import SS304L
 from plot import *
+from recorder import disk_snapshot_recorder
+from recorder import snapshot_recorder
+from recorder import snapshot_stores
+from solver import convergence_monitor
+from solver import time_integrators
+from solver import transient_solver
 from ui import *
 
 pi = math.pi
@@ -30,6 +46,78 @@ JetA1 = Jet_A1()
 
 materials = [SS, CCZ, JetA1]
 
+analysis_modes = ["transient", "steady"]
+
+# inputs the designs of an ensemble analysis must share, as they are stepped
+# together
+ensemble_inputs = [
+    "fineness_vertical",
+    "time_end",
+    "time_step",
+    "time_integrator",
+    "analysis_mode",
+    "tol_steady",
+    "tol_adaptive",
+    "sample_interval",
+    "sample_every_steps",
+    "probe_interval",
+    "snapshot_store",
+    "checkpoint_interval",
+    "film_tol",
+    "coolant_interval",
+    "coolant_tol",
+]
+
+# inputs the cached stages of an analysis depend on, later stages are reused
+# when only inputs that come after them change
+contour_inputs = param_names[:13] + ["fineness_vertical"]
+model3d_inputs = contour_inputs + [
+    "n_cochan",
+    "L_cochanInnerWallDist",
+    "L_cochanTangentialWidth",
+    "L_cochanDepth",
+    "L_filmInject1",
+    "mdot_filmInject1",
+    "L_filmInject2",
+    "mdot_filmInject2",
+]
+mach_inputs = contour_inputs + [
+    "T_c",
+    "gamma_thrt",
+    "avgMolecularMass",
+    "mesh_grading",
+    "refine_levels",
+]
+
+
+def get_cached(cache, stage, config, inputs):
+    """Returns the cached result of an analysis stage, or None if there is
+    no cache or it doesn't have the result.
+
+    :param cache: result_cache or None
+    :param stage:
+    :param config: analysis_config
+    :param inputs: names of the inputs the stage depends on
+
+    """
+    if cache is None:
+        return None
+    return cache.get(stage, [getattr(config, name) for name in inputs])
+
+
+def put_cached(cache, stage, config, inputs, data):
+    """Stores the result of an analysis stage if there is a cache.
+
+    :param cache: result_cache or None
+    :param stage:
+    :param config: analysis_config
+    :param inputs: names of the inputs the stage depends on
+    :param data:
+
+    """
+    if cache is not None:
+        cache.put(stage, [getattr(config, name) for name in inputs], data)
+
 
 def get_material_by_name(mtlname):
     """
@@ -47,6 +135,75 @@ def get_material_by_name(mtlname):
         return materials[2]
 
 
+def get_optional_param(params, name, default):
+    """Returns the input called name (see config.param_names), or default if
+    that input was left empty or does not exist (design files saved by older
+    versions have fewer inputs).
+
+    :param params:
+    :param name:
+    :param default:
+
+    """
+    index = param_names.index(name)
+    if len(params) > index and params[index]:
+        return params[index]
+    return default
+
+
+def get_probe_locations(probe_text, x_thrt, film_injects):
+    """Turns the "Probe Locations" input into a list of x positions (m).
+
+    The input is a comma separated list of positions in meters, and may also
+    contain 'throat' and 'film' (every film cooling injection point in use).
+
+    :param probe_text:
+    :param x_thrt:
+    :param film_injects: list of (L_filmInject, mdot_filmInject)
+
+    """
+    probe_xs = []
+    for probe in str(probe_text).split(","):
+        probe = probe.strip()
+        if not probe:
+            continue
+        elif probe == "throat":
+            probe_xs.append(x_thrt)
+        elif probe == "film":
+            for L_filmInject, mdot_filmInject in film_injects:
+                if mdot_filmInject:
+                    probe_xs.append(L_filmInject)
+        else:
+            probe_xs.append(float(probe))
+
+    return probe_xs
+
+
+def get_film_injects(film_injects_text):
+    """Turns the "More Film Injectors" input into a list of
+    (L_filmInject, mdot_filmInject).
+
+    The input is a comma separated list of 'position:mass flow' pairs, in
+    meters and kg s-1.
+
+    :param film_injects_text:
+
+    """
+    film_injects = []
+    for film_inject in str(film_injects_text).split(","):
+        film_inject = film_inject.strip()
+        if not film_inject or film_inject == "0":
+            continue
+        try:
+            L_filmInject, mdot_filmInject = film_inject.split(":")
+            film_injects.append((float(L_filmInject), float(mdot_filmInject)))
+        except ValueError:
+            raise ValueError("Invalid film injector '" + film_inject +
+                             "', expected 'position:mass flow' (m:kg/s)")
+
+    return film_injects
+
+
 def get_cylinder_index_at(x, L_engine, fineness_vertical):
     """
 
@@ -58,14 +215,184 @@ def get_cylinder_index_at(x, L_engine, fineness_vertical):
     return int(x * fineness_vertical / L_engine)
 
 
-def perform(params, config_filename=None, getchar=True):
+class analysis_results:
+    """Everything an analysis computes: the engine geometry, the wall
+    segments and the recorded snapshots."""
+
+    def __init__(self, config, geom_x, geom_y, engine_lengths, vis_model,
+                 segs, solver, T_gases, time_steady, probe_xs, recorder,
+                 probe_recorder, folder_name):
+        """
+
+        :param config:
+        :param geom_x:
+        :param geom_y:
+        :param engine_lengths:
+        :param vis_model:
+        :param segs:
+        :param solver:
+        :param T_gases:
+        :param time_steady: time the run stopped at steady state, or None
+        :param probe_xs:
+        :param recorder:
+        :param probe_recorder:
+        :param folder_name:
+
+        """
+        self.config = config
+
+        # - - - GEOMETRY - - -
+        self.geom_x = geom_x
+        self.geom_y = geom_y
+        self.engine_lengths = engine_lengths
+        self.vis_model = vis_model
+        self.xs = segs.x.tolist()
+        self.Machs = segs.Mach.tolist()
+        self.flow_areas = solver.flow_area.tolist()
+        self.wet_perimeters = solver.wet_perimeter.tolist()
+        self.D_hydros = solver.D_hydro.tolist()
+        self.mdot_clts = solver.mdot_clts.tolist()
+
+        # engine mass and important coolant channel widths
+        if solver.wall is None:
+            self.m_engine = float(segs.get_m().sum())
+        else:
+            self.m_engine = float(solver.wall.get_m().sum())
+
+        # the node temps. of a radially resolved wall are not recorded, only
+        # those at the end of the run are kept to warm start from
+        if solver.wall is None:
+            self.T_nodes = None
+        else:
+            self.T_nodes = solver.wall.T.copy()
+        chan_widths = segs.get_chan_widths()
+        self.L_skirt_chan_width = chan_widths[-1]
+        self.L_min_chan_width = chan_widths.min()
+        self.L_max_chan_width = chan_widths.max()
+        self.L_chamber_chan_width = chan_widths[0]
+
+        # - - - RECORDED DATA - - -
+        self.T_gases = T_gases
+        self.time_steady = time_steady
+        self.probe_xs = probe_xs
+        self.recorder = recorder
+        self.probe_recorder = probe_recorder
+        self.folder_name = folder_name
+
+    def get(self, name):
+        """Returns the recorded snapshots of a quantity (see
+        recorder.station_quantities and recorder.scalar_quantities).
+
+        :param name:
+
+        """
+        return self.recorder.get(name)
+
+    def get_probes(self):
+        """Returns a dict of the recorded probe snapshots, or None."""
+        if self.probe_recorder:
+            return self.probe_recorder.get_all()
+        return None
+
+    def get_final_state(self):
+        """Returns the last recorded wall temps. as a state another analysis
+        can warm start from (see transient_solver.warm_start())."""
+        T = self.get("cylinder_temps")[-1] + 273
+        T_diff = (self.get("cylinder_temps_in")[-1] -
+                  self.get("cylinder_temps_out")[-1])
+        state = {"x": numpy.array(self.xs), "T": T, "T_diff": T_diff}
+        if getattr(self, "T_nodes", None) is not None:
+            state["T_nodes"] = self.T_nodes
+        return state
+
+
+def get_n_snapshots(time_end, time_step, sample_interval, sample_every_steps):
+    """Returns the number of full-field snapshots to allocate for a transient
+    analysis. Runs with adaptive time steps may take more steps than that,
+    the recorders grow when they do.
+
+    :param time_end:
+    :param time_step: (first) time step
+    :param sample_interval: time between snapshots
+    :param sample_every_steps: number of steps between snapshots, or None to
+        use sample_interval
+
     """
+    if sample_every_steps:
+        n_steps = int(math.ceil(time_end / time_step - 1e-9))
+        return int(math.ceil(n_steps / sample_every_steps)) + 1
+    return int(math.ceil(time_end / sample_interval)) + 1
 
-    :param params:
-    :param config_filename:  (Default value = None)
-    :param getchar:  (Default value = True)
+
+def get_snapshot(solver, time):
+    """Returns the current solver state as recorded quantities.
+
+    :param solver:
+    :param time:
+
+    """
+    return {
+        "times": time,
+        # convert heat of the last step to W
+        "Q_ins": solver.Q_in / solver.time_step,
+        "Q_in_per_areas": solver.Q_in_per_area,
+        "Q_outs": solver.Q_out / solver.time_step,
+        # convert temperatures to celcius
+        "cylinder_temps": solver.segs.T - 273,
+        "cylinder_temps_out": solver.segs.T - solver.segs.T_diff / 2 - 273,
+        "cylinder_temps_in": solver.segs.T + solver.segs.T_diff / 2 - 273,
+        "coolant_temps": solver.T_clt_stations - 273,
+        "coolant_presses": solver.P_clt_stations,
+        "Reynolds": solver.Reynolds,
+        "Nusselts": solver.Nusselt,
+        "h_gs": solver.h_g,
+        "h_ls": solver.h_l,
+        "T_films": solver.T_films,
+        "clt_vels": solver.clt_vel,
+        "rT_layers_plot": solver.rT_layers,
+        "T_effectives": solver.T_effective,
+        "coolant_press_drops": solver.press_drop,
+        "Q_in_fulls": solver.Q_in.sum() / solver.time_step,
+        "Q_out_fulls": solver.Q_out.sum() / solver.time_step,
+        "total_clt_press_drops": solver.press_drop.sum(),
+    }
+
+
+def get_warm_start(config, warm_start=None):
+    """Returns the state an analysis warm starts from: warm_start if given,
+    otherwise the solver state in the config's warm start file, or None.
+
+    :param config: analysis_config
+    :param warm_start: state to use instead of the warm start file (Default value = None)
 
     """
+    if warm_start is not None:
+        return warm_start
+
+    warm_start_file = get_optional_param(config.get_params(),
+                                         "warm_start_file", "")
+    if not warm_start_file:
+        return None
+    if not os.path.exists(warm_start_file):
+        raise ValueError("Warm start file '" + warm_start_file +
+                         "' does not exist")
+    return load_checkpoint(warm_start_file)["solver"]
+
+
+def build_model(config, verbose=False, cache=None, stations=None):
+    """Builds the engine geometry, the wall segments and the transient_solver
+    of an analysis.
+
+    Returns (geom_x, geom_y, engine_lengths, vis_model, segs, solver).
+
+    :param config: analysis_config
+    :param verbose: print what is being done and ask before giving up (Default value = False)
+    :param cache: result_cache for the contour, 3D model and Mach distribution (Default value = None)
+    :param stations: (positions, heights) of the stations, instead of the
+        mesh the inputs ask for (Default value = None)
+
+    """
+    params = config.get_params()
 
     # - - - ENGINE GEOMETRY - - -
     L_engine = params[0]  # m
@@ -152,6 +479,13 @@ def perform(params, config_filename=None, getchar=True):
     L_filmInject2 = params[19]  # m
     mdot_filmInject2 = params[20]  # m
 
+    # any number of injectors after the first two, in flow order, as the film
+    # mixing layer is measured from the last injector in the list upstream
+    film_injects = [(L_filmInject1, mdot_filmInject1),
+                    (L_filmInject2, mdot_filmInject2)]
+    film_injects += sorted(
+        get_film_injects(get_optional_param(params, "film_injects_text", "")))
+
     # - - - COMBUSTION / CEA - - -
     D_star = D_thrt  # m
     mdot_chamber = params[21]  # kg s-1
@@ -184,105 +518,59 @@ def perform(params, config_filename=None, getchar=True):
 
     # - - - ANALYSIS - - -
     fineness_vertical = params[38]
-    time_end = params[39]  # s
-    time_step = params[40]  # s
-    n_steps = int(time_end / time_step)
+    time_integrator = get_optional_param(params, "time_integrator", "explicit")
 
-    # calculate engine geometry
-    if type_nozzle == "conic":
-        geom_x, geom_y, x_step, engine_lengths = calculate_geometry(
-            L_engine,
-            D_chm,
-            D_thrt,
-            D_exit,
-            a_chmContract,
-            ROC_chm,
-            a_nzlExp,
-            ROC_thrtDn,
-            ROC_thrtUp,
-            fineness_vertical,
-        )
-    else:
-        geom_x, geom_y, x_step, engine_lengths = calculate_geometry_bell(
-            L_engine,
-            D_chm,
-            D_thrt,
-            D_exit,
-            ROC_chm,
-            a_chmContract,
-            fineness_vertical,
-            percentLength_nzl,
-            theta_n_nzl,
-            theta_e_nzl,
-            20,
-            1000,
-        )
+    # stations are placed closer together around the throat on a graded
+    # mesh, mesh_grading is the ratio of the largest to the smallest height
+    mesh_grading = get_optional_param(params, "mesh_grading", 1)
 
-    # generate 3D object
-    print("\nGenerating 3D model...")
-    vis_model = generate_3D_blade(
-        geom_x,
-        geom_y,
-        n_cochan,
-        L_cochanInnerWallDist,
-        L_cochanTangentialWidth,
-        L_cochanDepth,
-        mdot_filmInject1,
-        L_filmInject1,
-        mdot_filmInject2,
-        L_filmInject2,
-    )
+    if mesh_grading < 1:
+        raise ValueError("The mesh grading must be at least 1")
 
-    # calculate Mach distribution
-    print("Calculating Mach distribution...")
-    if type_nozzle == "conic":
-        subsonic_x, subsonic_M, supersonic_x, supersonic_M = calc_mach_num(
-            L_engine,
-            engine_lengths[4],
-            T_c,
-            gamma_thrt,
-            avgMolecularMass,
-            fineness_vertical,
-            L_engine,
-            D_chm,
-            D_thrt,
-            D_exit,
-            a_chmContract,
-            ROC_chm,
-            a_nzlExp,
-            ROC_thrtDn,
-            ROC_thrtUp,
-        )
-    else:
-        subsonic_x, subsonic_M, supersonic_x, supersonic_M = calc_mach_num_bell(
-            L_engine,
-            engine_lengths[4],
-            T_c,
-            gamma_thrt,
-            avgMolecularMass,
-            fineness_vertical,
-            L_engine,
-            D_chm,
-            D_thrt,
-            D_exit,
-            a_chmContract,
-            ROC_chm,
-            percentLength_nzl,
-            theta_n_nzl,
-            theta_e_nzl,
-        )
+    # adaptive mesh refinement, see build_refined_model()
+    refine_levels = get_optional_param(params, "refine_levels", 0)
 
-    # generate cylinders
-    print("Generating segments...")
-    m_engine = 0
-    r_prev = None
-    cylinders = []
+    if time_integrator not in time_integrators:
+        raise ValueError("Unknown time integrator '" + str(time_integrator) +
+                         "', use one of: " + ", ".join(time_integrators))
 
-    if type_nozzle == "conic":
-        for i in range(fineness_vertical):
-            x = i * x_step
-            r_in = get_inner_radius_at(
-                x,
+    # the film march is only repeated when the film injection temp. changes
+    # by more than film_tol
+    film_tol = get_optional_param(params, "film_tol", 0)  # K
+
+    # multi-rate: the coolant march is repeated every coolant_interval steps,
+    # or as soon as the wall temps. change by more than coolant_tol
+    coolant_tol = get_optional_param(params, "coolant_tol", None)  # K
+    if coolant_tol:
+        coolant_interval = get_optional_param(params, "coolant_interval",
+                                              math.inf)
+    else:
+        coolant_interval = get_optional_param(params, "coolant_interval", 1)
+
+    # the coolant march can be JIT-compiled with numba, if installed
+    kernel_backend = get_optional_param(params, "kernel_backend", "python")
+
+    if kernel_backend not in kernel_backends:
+        raise ValueError("Unknown kernel backend '" + str(kernel_backend) +
+                         "', use one of: " + ", ".join(kernel_backends))
+
+    # the wall is resolved radially (liner, ribs and outer shell) with more
+    # than one node per station
+    wall_nodes = get_optional_param(params, "wall_nodes", 1)
+    L_outerShellThickness = get_optional_param(params, "L_outerShellThickness",
+                                               L_cochanInnerWallDist)  # m
+
+    if wall_nodes == 2 or wall_nodes < 1:
+        raise ValueError("The wall needs 1 node or at least 3 radial nodes "
+                         "(liner, ribs and outer shell)")
+
+    # the contour, the 3D model and the Mach distribution are cached
+    # separately, so that they are reused when only later inputs change
+    contour = get_cached(cache, "contour", config, contour_inputs)
+    if contour is None:
+        # calculate engine geometry
+        if type_nozzle == "conic":
+            geom_x, geom_y, x_step, engine_lengths = calculate_geometry(
                 L_engine,
                 D_chm,
                 D_thrt,
@@ -292,34 +580,128 @@ def perform(params, config_filename=None, getchar=True):
                 a_nzlExp,
                 ROC_thrtDn,
                 ROC_thrtUp,
+                fineness_vertical,
             )
-            r_clt = r_in + L_cochanInnerWallDist
-            r_out = r_clt + L_cochanDepth
-            a_clt = L_cochanTangentialWidth
-            b_clt = L_cochanDepth
-            Mach = get_mach_num_at(x, subsonic_M, subsonic_x, supersonic_M,
-                                   supersonic_x, engine_lengths)
-            new_cylinder = cylinder(
-                x,
-                r_in,
-                r_out,
-                x_step,
-                n_cochan,
-                r_clt,
-                a_clt,
-                b_clt,
-                mtl_innerWall,
-                T_w,
-                Mach,
-                r_prev,
+        else:
+            geom_x, geom_y, x_step, engine_lengths = calculate_geometry_bell(
+                L_engine,
+                D_chm,
+                D_thrt,
+                D_exit,
+                ROC_chm,
+                a_chmContract,
+                fineness_vertical,
+                percentLength_nzl,
+                theta_n_nzl,
+                theta_e_nzl,
+                20,
+                1000,
             )
-            cylinders.append(new_cylinder)
-            m_engine += new_cylinder.get_m()
 
-            r_prev = r_in
+        contour = (geom_x, geom_y, x_step, engine_lengths)
+        put_cached(cache, "contour", config, contour_inputs, contour)
+    geom_x, geom_y, x_step, engine_lengths = contour
+
+    vis_model = get_cached(cache, "model3d", config, model3d_inputs)
+    if vis_model is None:
+        # generate 3D object
+        if verbose:
+            print("\nGenerating 3D model...")
+        vis_model = generate_3D_blade(
+            geom_x,
+            geom_y,
+            n_cochan,
+            L_cochanInnerWallDist,
+            L_cochanTangentialWidth,
+            L_cochanDepth,
+            mdot_filmInject1,
+            L_filmInject1,
+            mdot_filmInject2,
+            L_filmInject2,
+        )
+        put_cached(cache, "model3d", config, model3d_inputs, vis_model)
+
+    mach_tables = get_cached(cache, "mach", config, mach_inputs)
+    if mach_tables is None:
+        # calculate Mach distribution
+        if verbose:
+            print("Calculating Mach distribution...")
+        # the Mach table must be as fine as the finest stations
+        fineness_mach = int(
+            math.ceil(fineness_vertical * mesh_grading * 2**refine_levels))
+        if type_nozzle == "conic":
+            subsonic_x, subsonic_M, supersonic_x, supersonic_M = calc_mach_num(
+                L_engine,
+                engine_lengths[4],
+                T_c,
+                gamma_thrt,
+                avgMolecularMass,
+                fineness_mach,
+                L_engine,
+                D_chm,
+                D_thrt,
+                D_exit,
+                a_chmContract,
+                ROC_chm,
+                a_nzlExp,
+                ROC_thrtDn,
+                ROC_thrtUp,
+                interactive=verbose,
+            )
+        else:
+            subsonic_x, subsonic_M, supersonic_x, supersonic_M = calc_mach_num_bell(
+                L_engine,
+                engine_lengths[4],
+                T_c,
+                gamma_thrt,
+                avgMolecularMass,
+                fineness_mach,
+                L_engine,
+                D_chm,
+                D_thrt,
+                D_exit,
+                a_chmContract,
+                ROC_chm,
+                percentLength_nzl,
+                theta_n_nzl,
+                theta_e_nzl,
+                interactive=verbose,
+            )
+        mach_tables = (subsonic_x, subsonic_M, supersonic_x, supersonic_M)
+        put_cached(cache, "mach", config, mach_inputs, mach_tables)
+    subsonic_x, subsonic_M, supersonic_x, supersonic_M = mach_tables
+
+    # generate wall segments
+    if verbose:
+        print("Generating segments...")
+
+    # wall segment positions, heights, radii and Mach numbers
+    if stations is not None:
+        seg_xs, seg_hs = stations
+    elif mesh_grading > 1:
+        seg_xs, seg_hs = get_graded_stations(L_engine, fineness_vertical,
+                                             engine_lengths[4], D_thrt,
+                                             mesh_grading)
     else:
-        for i in range(fineness_vertical):
-            x = i * x_step
+        seg_xs = [i * x_step for i in range(fineness_vertical)]
+        seg_hs = x_step
+    seg_r_ins = []
+
+    for x in seg_xs:
+        if type_nozzle == "conic":
+            r_in = get_inner_radius_at(
+                x,
+                L_engine,
+                D_chm,
+                D_thrt,
+                D_exit,
+                a_chmContract,
+                ROC_chm,
+                a_nzlExp,
+                ROC_thrtDn,
+                ROC_thrtUp,
+            )
+        else:
             r_in = get_inner_radius_at_bell(
                 x,
                 L_engine,
@@ -332,50 +714,33 @@ def perform(params, config_filename=None, getchar=True):
                 theta_n_nzl,
                 theta_e_nzl,
             )
-            r_clt = r_in + L_cochanInnerWallDist
-            r_out = r_clt + L_cochanDepth
-            a_clt = L_cochanTangentialWidth
-            b_clt = L_cochanDepth
-            Mach = get_mach_num_at(x, subsonic_M, subsonic_x, supersonic_M,
-                                   supersonic_x, engine_lengths)
-            new_cylinder = cylinder(
-                x,
-                r_in,
-                r_out,
-                x_step,
-                n_cochan,
-                r_clt,
-                a_clt,
-                b_clt,
-                mtl_innerWall,
-                T_w,
-                Mach,
-                r_prev,
-            )
-            cylinders.append(new_cylinder)
-            m_engine += new_cylinder.get_m()
-
-            r_prev = r_in
-
-    # get important coolant channel widths
-    L_skirt_chan_width = (2 * pi *
-                          cylinders[-1].r_clt) * (cylinders[-1].a_clt / 360)
-
-    L_min_chan_width = None
-    L_max_chan_width = None
-
-    for cylin in cylinders:
-        if (not L_min_chan_width or (2 * pi * cylin.r_clt) *
-            (cylin.a_clt / 360) < L_min_chan_width):
-            L_min_chan_width = (2 * pi * cylin.r_clt) * (cylin.a_clt / 360)
-
-        if (not L_max_chan_width or (2 * pi * cylin.r_clt) *
-            (cylin.a_clt / 360) > L_max_chan_width):
-            L_max_chan_width = (2 * pi * cylin.r_clt) * (cylin.a_clt / 360)
-
-    L_chamber_chan_width = (2 * pi *
-                            cylinders[0].r_clt) * (cylinders[0].a_clt / 360)
-
+        seg_r_ins.append(r_in)
+
+    seg_Machs = [
+        get_mach_num_at(x, subsonic_M, subsonic_x, supersonic_M, supersonic_x,
+                        engine_lengths) for x in seg_xs
+    ]
+
+    seg_r_clts = [r_in + L_cochanInnerWallDist for r_in in seg_r_ins]
+    seg_r_outs = [r_clt + L_cochanDepth for r_clt in seg_r_clts]
+    segs = wall_segments(
+        seg_xs,
+        seg_r_ins,
+        seg_r_outs,
+        seg_hs,
+        n_cochan,
+        seg_r_clts,
+        L_cochanTangentialWidth,
+        L_cochanDepth,
+        mtl_innerWall,
+        T_w,
+        seg_Machs,
+    )
+    if wall_nodes > 1:
+        wall = radial_wall(segs, wall_nodes, mtl_outerShell,
+                           L_outerShellThickness)
+    else:
+        wall = None
     # calculate Cp and Pr
     Cp_chm = ((gamma_chm / (gamma_chm - 1)) * uni_gas_const / avgMolecularMass
               )  # kJ kg-1 K-1, CEA
@@ -386,419 +751,634 @@ def perform(params, config_filename=None, getchar=True):
     )  # kJ kg-1 K-1, CEA
     Pr_thrt = (4 * gamma_thrt) / (9 * gamma_thrt - 5)  # unitless
 
-    Q_ins = []
-    Q_in_per_areas = []
-    Q_outs = []
-    xs = []
-    cylinder_temps = []
-    cylinder_temps_out = []
-    cylinder_temps_in = []
-    coolant_temps = []
-    coolant_presses = []
-    Reynolds = []
-    Nusselts = []
-    T_gases = []
-    h_gs = []
-    h_ls = []
-    clt_vels = []
-    Q_in_fulls = []
-    Q_out_fulls = []
-    flow_areas = []
-    wet_perimeters = []
-    D_hydros = []
-    mdot_clts = []
-    T_films = []
-    rT_layers_plot = []
-    T_effectives = []
-    coolant_press_drops = []
-    total_clt_press_drops = []
+    solver = transient_solver(
+        segs,
+        engine_lengths[4],
+        D_star,
+        r_c,
+        A_star,
+        P_c,
+        T_c,
+        c_star,
+        (visc_chm, gamma_chm, Cp_chm, Pr_chm),
+        (visc_thrt, gamma_thrt, Cp_thrt, Pr_thrt),
+        mtl_clt,
+        mdot_clt,
+        T_clt,
+        P_clt,
+        mdot_chamber,
+        film_injects,
+        time_integrator,
+        film_tol,
+        coolant_interval,
+        coolant_tol,
+        kernel_backend,
+        wall,
+    )
+
+    return geom_x, geom_y, engine_lengths, vis_model, segs, solver
 
-    time = 0
-    j = 0
-
-    T_film = 350  # initial guess for the first cycle
-
-    for t_step in range(n_steps):
-
-        if t_step % 100 == 0:
-            Q_ins.append([])
-            Q_in_per_areas.append([])
-            Q_outs.append([])
-            cylinder_temps.append([])
-            cylinder_temps_out.append([])
-            cylinder_temps_in.append([])
-            coolant_temps.append([])
-            coolant_presses.append([])
-            Reynolds.append([])
-            Nusselts.append([])
-            h_gs.append([])
-            h_ls.append([])
-            T_films.append([])
-            clt_vels.append([])
-            rT_layers_plot.append([])
-            T_effectives.append([])
-            coolant_press_drops.append([])
-            Q_in_full = 0
-            Q_out_full = 0
-            total_clt_press_drop = 0
-
-        T_clt_current = T_clt  # revert to manifold temperature
-        P_clt_current = P_clt  # revert to manifold pressure
-        mdot_clt_current = mdot_clt  # revert to manifold mass flow
-
-        film_exists1 = False
-        film_exists2 = False
-        cylinder_film_exists = [False] * len(cylinders)
-        rT_layers = [1] * len(cylinders)  # T_film/T_gas ratio
-        T_aw = 0  # adiabatic wall temp.
-
-        i_cylinder_film = -1
-        mdot_film_current = mdot_filmInject1
-        # loop forwards when computing film cooling
-        for cy in cylinders:
-            i_cylinder_film += 1
-
-            if cy.x < engine_lengths[4]:  # before throat
-                vis = visc_chm
-                gamma = gamma_chm
-                Cp = Cp_chm
-                Pr = Pr_chm
-            else:  # after throat
-                vis = visc_thrt
-                gamma = gamma_thrt
-                Cp = Cp_thrt
-                Pr = Pr_thrt
-
-            M = cy.get_Mach()
-            A = pi * cy.r_in**2
-
-            xd1 = cy.x - L_filmInject1
-            xd2 = cy.x - L_filmInject2
-            Hs = 0.025 * cy.r_in
-            # coefficient for intensity of turbulent mixing
-            Kt = 0.12 * 10**(-2)
-            # every time you adjust this parameter, a kitten dies.
-
-            # calculate flow temperature at point
-            T_gas = (1 + (gamma - 1) / 2 * M**2)**(-1) * T_c
-
-            # calculate heat transfer coeff
-            h_g = get_convection_coeff(D_star, vis, Cp, Pr, P_c, c_star, r_c,
-                                       A_star, A, gamma, M, T_film, T_c)
-
-            if mdot_filmInject1:
-                # no film yet
-                if cy.x < L_filmInject1:
-                    film_exists1 = False
-                    film_exists2 = False
-
-                # first injection here
-                if not film_exists1 and cy.x >= L_filmInject1:
-                    film_exists1 = True
-                    mdot_clt_current = mdot_clt - (mdot_filmInject1 / n_cochan)
-                    mdot_film_current = mdot_filmInject1
-
-                # second injection here
-                if not film_exists2 and cy.x >= L_filmInject2:
-                    film_exists2 = True
-                    mdot_clt_current -= mdot_filmInject2 / n_cochan
-                    mdot_film_current += mdot_filmInject2
-
-                if cy.x >= L_filmInject1 and mdot_film_current >= 0:
-
-                    mdot_totalFilm = mdot_filmInject1
-
-                    if cy.x >= L_filmInject2:
-                        mdot_totalFilm += mdot_filmInject2
-
-                    stability_coeff = 0.6
-                    dT_film = h_g * (T_gas - T_film) * cy.get_A_chm()
-                    dT_film *= (stability_coeff * mdot_totalFilm *
-                                mtl_clt.get_specific_heat(T_film))**(-1)
-
-                    if T_film + dT_film < 600:  # TODO: add this to material properties
-                        T_film += dT_film  # increase film temperature
-                        cylinder_film_exists[i_cylinder_film] = True
-
-                    else:  # check vaporization
-                        dmdot_film = (h_g * (T_gas - T_film) * cy.get_A_chm(
-                        )) / mtl_clt.get_heat_of_vaporization(T_film)
-
-                        if (mdot_film_current - dmdot_film
-                                > 0):  # still not completely vaporized
-                            mdot_film_current -= dmdot_film
-                            cylinder_film_exists[i_cylinder_film] = True
-
-                        # liquid film has completely vaporized (and is now in gas form)
-                        else:
-                            cylinder_film_exists[i_cylinder_film] = False
-                            mdot_film_current = 0
-
-                            if cy.x >= L_filmInject1 and cy.x < L_filmInject2:
-                                mbar_f = mdot_filmInject1 / (mdot_chamber +
-                                                             mdot_filmInject1)
-                                A_surface_layer = (pi * cy.r_in**2 - pi *
-                                                   (cy.r_in - Hs)**2)
-                                mdot_surface_layer = (
-                                    A_surface_layer /
-                                    (pi * cy.r_in**2)) * mdot_chamber
-                                mbar_s = mdot_surface_layer / (
-                                    mdot_chamber + mdot_filmInject1)
-                                x_squared = xd1 / Hs
-                                bigM = Kt * (mbar_s / mbar_f)
-                                xeta = 1 - euler**(-x_squared * bigM)
-                                T_layer = T_film * (1 - xeta) + T_film * xeta
-                                # T_layer = (T_film + xeta * (T_c - T_film))
-                                rT_layers[i_cylinder_film] = xeta
-
-                            elif cy.x >= L_filmInject2 and cy.x >= L_filmInject2:
-                                mbar_f = (mdot_filmInject1 +
-                                          mdot_filmInject2) / (
-                                              mdot_chamber + mdot_filmInject1 +
-                                              mdot_filmInject2)
-                                A_surface_layer = (pi * cy.r_in**2 - pi *
-                                                   (cy.r_in - Hs)**2)
-                                mdot_surface_layer = (
-                                    A_surface_layer /
-                                    (pi * cy.r_in**2)) * mdot_chamber
-                                mbar_s = mdot_surface_layer / (
-                                    mdot_chamber + mdot_filmInject1 +
-                                    mdot_filmInject2)
-                                x_squared = xd2 / Hs
-                                bigM = Kt * (mbar_s / mbar_f)
-                                xeta = 1 - euler**(-x_squared * bigM)
-                                T_layer = T_film * (1 - xeta) + T_film * xeta
-                                # T_layer = (T_film + xeta * (T_c - T_film))
-                                rT_layers[i_cylinder_film] = xeta
-
-            if t_step % 100 == 0:
-                T_films[j].append(T_film)
-
-        film_inject_point1 = False
-        film_inject_point2 = False
-        i_cylinder_regen = len(cylinders)
-        # loop backwards when computing cylinder heat transfer (go from manifold to injector face)
-        for cy in cylinders[::-1]:
-            i_cylinder_regen -= 1
-
-            if cy.x < engine_lengths[4]:
-                vis = visc_chm
-                gamma = gamma_chm
-                Cp = Cp_chm
-                Pr = Pr_chm
-            else:
-                vis = visc_thrt
-                gamma = gamma_thrt
-                Cp = Cp_thrt
-                Pr = Pr_thrt
-
-            M = cy.get_Mach()
-            A = pi * cy.r_in**2
-
-            # calculate flow temperature at point
-            T_gas = (1 + (gamma - 1) / 2 * M**2)**(-1) * T_c
-
-            # calculate heat transfer
-            h_g = get_convection_coeff(D_star, vis, Cp, Pr, P_c, c_star, r_c,
-                                       A_star, A, gamma, M, cy.T, T_c)
-
-            # get film cooling injection point temperature
-            if not film_inject_point1 and cy.x <= L_filmInject1:
-                film_inject_point1 = True
-                T_film = T_clt_current
-                mdot_clt_current -= mdot_filmInject1 / n_cochan
-
-            if not film_inject_point2 and cy.x <= L_filmInject2:
-                film_inject_point2 = True
-                T_film = T_clt_current
-                mdot_clt_current -= mdot_filmInject2 / n_cochan
-
-            # no film cooling on this cylinder
-            if not cylinder_film_exists[i_cylinder_regen]:
-
-                T_effective = min(
-                    T_film + rT_layers[i_cylinder_regen] * (T_gas - T_film),
-                    T_gas)
-                Q_in = (h_g * (T_effective - (cy.T + cy.T_diff / 2)) *
-                        cy.get_A_chm() * time_step)
-                # W per m2 (this is only for plotting)
-                Q_in_per_area = h_g * (T_effective - (cy.T + cy.T_diff / 2))
-                Q_in_full += Q_in
-
-            else:  # there is liquid film cooling on this cylinder
-                Q_in = 0
-                Q_in_per_area = 0
-
-            # compute Reynold's number
-            # https://en.wikipedia.org/wiki/Hydraulic_diameter
-            wet_perimeter = cy.a_clt + 2 * cy.b_clt
-            flow_area = cy.A_cochan_flow
-            D_hydro = 4 * (flow_area / wet_perimeter)
-            Reynolds_num = (mdot_clt_current * D_hydro) / (
-                mtl_clt.get_viscosity(T_clt_current) * cy.A_cochan_flow)
-
-            if not mdot_clt == 0:
-                # compute heat absorption into regen cooling channels
-                # h_l = get_h_clt_kerosene(mtl_clt, T_clt_current, mdot_clt, D_hydro, cy)
-                h_l = get_h_clt_dittus_boelter(mtl_clt, T_clt,
-                                               mdot_clt_current, D_hydro, cy)
-                Q_out = (h_l * ((cy.T - cy.T_diff / 2) - T_clt_current) *
-                         cy.get_A_clt() * time_step)
-                Q_out_full += Q_out
-
-                # increase cylinder temp
-                Q_net = Q_in - Q_out
-                dT = Q_net / cy.get_heat_capacity()
-                cy.T += dT
-                cy.T_diff = Q_net * cy.get_thermal_resistance() / time_step
-
-                # increase coolant fluid temp.
-                clt_vel = mdot_clt_current / (
-                    mtl_clt.get_density(T_clt_current) * cy.A_cochan_flow)
-                dT_clt = (Q_out / (n_cochan * time_step)) / (
-                    mdot_clt_current *
-                    mtl_clt.get_specific_heat(T_clt_current))
-                T_clt_current += dT_clt
-
-                # compute Nusselt number (Dittus Boelter)
-                Pr_clt = (mtl_clt.get_specific_heat(T_clt) *
-                          mtl_clt.get_viscosity(T_clt) /
-                          mtl_clt.get_thermal_conductivity(T_clt))
-                Nusselt_num = 0.023 * Reynolds_num**0.8 * Pr_clt**0.3
-
-                # compute coolant pressure drop and update pressures
-                epsilon_f = 1
-
-                if Reynolds_num <= 2320:
-                    friction_loss_coeff = (64 / Reynolds_num) * epsilon_f
-                elif Reynolds_num < 10e5:
-                    friction_loss_coeff = (0.3164 /
-                                           (Reynolds_num**(1 / 4))) * epsilon_f
-                else:
-                    friction_loss_coeff = (0.0032 + (0.221 /
-                                                     (Reynolds_num**
-                                                      (0.237)))) * epsilon_f
 
-                coolant_press_drop = (friction_loss_coeff * (cy.h / D_hydro) *
-                                      mtl_clt.get_density(T_clt_current) *
-                                      ((clt_vel**2) / 2))
-                P_clt_current -= coolant_press_drop
-                total_clt_press_drop += coolant_press_drop
+def build_refined_model(config, verbose=False, cache=None):
+    """Builds the model of an analysis (see build_model()) on a mesh that is
+    adapted to its steady state.
+
+    Every pass solves the steady state and splits the stations where the
+    heat flux or the inner wall temp. changes by more than refine_tol
+    towards a neighbour (see geometry.get_refined_stations()), then solves
+    again on the new mesh, starting from the last solution. Stations are
+    split at most refine_levels times, and flat regions are merged up to
+    twice the height the inputs ask for.
+
+    Returns the model on the final mesh, with its solver still at the initial
+    wall temp., and the steady state of the last pass.
+
+    :param config: analysis_config
+    :param verbose: print what is being done and ask before giving up (Default value = False)
+    :param cache: result_cache (Default value = None)
+
+    """
+    params = config.get_params()
+    refine_levels = get_optional_param(params, "refine_levels", 0)
+    refine_tol = get_optional_param(params, "refine_tol", 0.05)
+
+    model = build_model(config, verbose, cache)
+    segs = model[4]
+    h_min = segs.h.min() / 2**refine_levels
+    h_max = 2 * segs.h.max()
+
+    # a station needs one pass to be split, one more lets the mesh settle
+    state = None
+    for i_pass in range(refine_levels + 1):
+        segs, solver = model[4], model[5]
+        if state is not None:
+            solver.warm_start(state)
+        solver.solve_steady()
+        state = solver.get_state()
+
+        xs, hs = get_refined_stations(segs.x, segs.h, solver.Q_in_per_area,
+                                      segs.T + segs.T_diff / 2, refine_tol,
+                                      h_min, h_max)
+        if len(xs) == len(segs) and numpy.allclose(xs, segs.x):
+            break
+        model = build_model(config, False, cache, (xs, hs))
+
+    # the analysis itself starts from the initial wall temp.
+    model = build_model(config, False, cache, (model[4].x, model[4].h))
+    if verbose:
+        print("Mesh refined to", len(model[4]), "stations in", i_pass + 1,
+              "passes.")
+
+    return model, state
+
+
+def analyze(config,
+            folder_name=None,
+            restart_filename=None,
+            verbose=False,
+            progress=None,
+            progress_interval=0.5,
+            cache=None,
+            warm_start=None):
+    """Runs an analysis without plotting, terminal output or prompts, and
+    returns its analysis_results.
+
+    Files are only written if the config asks for them (disk snapshot store,
+    checkpoints), into folder_name.
+
+    With a result_cache, an analysis that was run before with the same
+    inputs returns the stored results straight away. Runs that write files
+    (disk snapshot store, checkpoints), are resumed or are warm started are
+    not cached.
+
+    A warm started analysis starts from the wall temps. of a previous run
+    instead of the uniform initial wall temp. With a steady state tolerance
+    it then stops as soon as the wall stops changing, which is much earlier
+    than a cold start if the designs are close.
+
+    :param config: analysis_config
+    :param folder_name: output folder (Default value = None)
+    :param restart_filename: checkpoint to resume the analysis from (Default value = None)
+    :param verbose: print what is being done and ask before giving up (Default value = False)
+    :param progress: function that takes a ui.progress_event (Default value = None)
+    :param progress_interval: min. real time between progress calls (Default value = 0.5)
+    :param cache: result_cache (Default value = None)
+    :param warm_start: state to start from, see get_warm_start() (Default value = None)
 
+    """
+    params = config.get_params()
+
+    # - - - ANALYSIS - - -
+    time_end = params[39]  # s
+    time_step = params[40]  # s
+    analysis_mode = get_optional_param(params, "analysis_mode", "transient")
+    tol_steady = get_optional_param(params, "tol_steady", None)  # K s-1
+
+    if analysis_mode not in analysis_modes:
+        raise ValueError("Unknown analysis mode '" + str(analysis_mode) +
+                         "', use one of: " + ", ".join(analysis_modes))
+
+    # adaptive time stepping, the "Time Steps" input becomes the first step
+    tol_adaptive = get_optional_param(params, "tol_adaptive", None)  # K
+    time_step_min = get_optional_param(params, "time_step_min",
+                                       time_step / 1000)  # s
+    time_step_max = get_optional_param(params, "time_step_max", time_end)  # s
+
+    # - - - RECORDING - - -
+    sample_interval = get_optional_param(params, "sample_interval",
+                                         100 * time_step)  # s
+    sample_every_steps = get_optional_param(params, "sample_every_steps", None)
+    probe_text = get_optional_param(params, "probe_text", "")
+    probe_interval = get_optional_param(params, "probe_interval",
+                                        time_step)  # s
+    snapshot_store = get_optional_param(params, "snapshot_store", "memory")
+    checkpoint_interval = get_optional_param(params, "checkpoint_interval",
+                                             None)  # s (real time)
+
+    if snapshot_store not in snapshot_stores:
+        raise ValueError("Unknown snapshot store '" + str(snapshot_store) +
+                         "', use one of: " + ", ".join(snapshot_stores))
+    if sample_every_steps is not None and sample_every_steps < 0:
+        raise ValueError("The number of steps between snapshots must be "
+                         "positive")
+
+    # a resumed analysis keeps writing into the folder of its checkpoint
+    if restart_filename and os.path.dirname(restart_filename):
+        folder_name = os.path.dirname(restart_filename)
+    elif not folder_name:
+        folder_name = get_folder_name()
+
+    # a resumed analysis continues from its own state instead
+    if restart_filename:
+        warm_start = None
+    else:
+        warm_start = get_warm_start(config, warm_start)
+
+    # only runs that keep everything in memory can be stored as a whole
+    if (snapshot_store != "memory" or restart_filename or checkpoint_interval
+            or warm_start is not None):
+        results_cache = None
+    else:
+        results_cache = cache
+
+    results = get_cached(results_cache, "results", config, param_names)
+    if results is not None:
+        if verbose:
+            print("Using cached results.")
+        results.folder_name = folder_name
+        return results
+
+    if get_optional_param(params, "refine_levels", 0):
+        model, refined_state = build_refined_model(config, verbose, cache)
+    else:
+        model = build_model(config, verbose, cache)
+        refined_state = None
+    geom_x, geom_y, engine_lengths, vis_model, segs, solver = model
+
+    if warm_start is not None:
+        if verbose:
+            print("Warm starting from a previous run...")
+        solver.warm_start(warm_start)
+    elif analysis_mode == "steady" and refined_state is not None:
+        # the mesh refinement has already solved the steady state
+        solver.warm_start(refined_state)
+
+    # probes are single stations recorded at a (usually) much higher rate
+    # than the full-field snapshots
+    probe_xs = get_probe_locations(
+        probe_text,
+        solver.x_thrt,
+        solver.film_injects,
+    )
+    i_probes = [segs.get_index_at(x) for x in probe_xs]
+    probe_xs = [float(segs.x[i]) for i in i_probes]
+
+    # snapshots are taken at fixed points in physical time, so that the
+    # recorded data doesn't depend on how many steps were taken, unless they
+    # are taken every sample_every_steps steps
+    if analysis_mode == "steady":
+        n_snapshots = 1
+        n_probe_snapshots = 1
+    else:
+        n_snapshots = get_n_snapshots(time_end, time_step, sample_interval,
+                                      sample_every_steps)
+        n_probe_snapshots = int(math.ceil(time_end / probe_interval)) + 1
+
+    checkpoint_filename = folder_name + "/checkpoint.npz"
+
+    if snapshot_store == "disk":
+        # long runs are streamed into the output folder instead of RAM
+        recorder = disk_snapshot_recorder(folder_name + "/snapshots",
+                                          n_snapshots, len(segs),
+                                          resume=bool(restart_filename))
+    else:
+        recorder = snapshot_recorder(n_snapshots, len(segs))
+
+    if i_probes and snapshot_store == "disk":
+        probe_recorder = disk_snapshot_recorder(folder_name + "/probes",
+                                                n_probe_snapshots, len(segs),
+                                                i_probes,
+                                                resume=bool(restart_filename))
+    elif i_probes:
+        probe_recorder = snapshot_recorder(n_probe_snapshots, len(segs),
+                                           i_probes)
+    else:
+        probe_recorder = None
+
+    time_steady = None
+
+    if progress:
+        reporter = progress_reporter(progress, progress_interval)
+    else:
+        reporter = None
+
+    if analysis_mode == "steady":
+        if verbose:
+            print("Solving steady state...")
+        n_iter = solver.solve_steady()
+        if verbose and n_iter:
+            print("Steady state reached in", n_iter, "iterations.")
+        elif verbose:
+            print("WARNING: Steady state solution did not converge!")
+
+        if reporter:
+            reporter.report(n_iter or 0, time_end, time_end, segs.T, True)
+
+        # the steady state is stored as a single frame, with heat flows in W
+        T_gases = solver.T_gas.tolist()
+        snapshot = get_snapshot(solver, 0)
+        recorder.record(snapshot)
+        if probe_recorder:
+            probe_recorder.record(snapshot)
+
+    else:
+        time = 0
+        t_step = 0
+        dt_next = time_step
+
+        t_sample = math.inf if sample_every_steps else sample_interval
+        t_probe = probe_interval
+        recorded = True
+        # set here as well, in case no step is taken
+        T_gases = solver.T_gas.tolist()
+
+        if tol_steady:
+            monitor = convergence_monitor(tol_steady)
+
+        def get_checkpoint():
+            """Returns everything needed to continue the analysis later."""
+            state = {
+                "solver": solver.get_state(),
+                "loop": {
+                    "time": time,
+                    "t_step": t_step,
+                    "dt_next": dt_next,
+                    "t_sample": t_sample,
+                    "t_probe": t_probe,
+                    "recorded": recorded,
+                    "T_gases": T_gases,
+                },
+                "recorder": recorder.get_state(),
+            }
+            if probe_recorder:
+                state["probe_recorder"] = probe_recorder.get_state()
+            if tol_steady:
+                state["monitor"] = monitor.get_state()
+            return state
+
+        if restart_filename:
+            if verbose:
+                print("Resuming analysis from", restart_filename)
+            state = load_checkpoint(restart_filename)
+            solver.set_state(state["solver"])
+            time = state["loop"]["time"]
+            t_step = state["loop"]["t_step"]
+            dt_next = state["loop"]["dt_next"]
+            t_sample = state["loop"]["t_sample"]
+            t_probe = state["loop"]["t_probe"]
+            recorded = state["loop"]["recorded"]
+            T_gases = state["loop"]["T_gases"].tolist()
+            recorder.set_state(state["recorder"])
+            if probe_recorder:
+                probe_recorder.set_state(state["probe_recorder"])
+            if tol_steady and "monitor" in state:
+                monitor.set_state(state["monitor"])
+
+        t_checkpoint = monotonic()
+
+        while time < time_end - 1e-9 * time_step:
+
+            if tol_adaptive:
+                # don't step over the next snapshot or the end of the analysis
+                dt_try = min(dt_next, t_sample - time, time_end - time)
+                dt, dt_suggested = solver.step_adaptive(
+                    dt_try, tol_adaptive, time_step_min, time_step_max)
+                if not (dt == dt_try and dt_try < dt_next):
+                    dt_next = dt_suggested
+                time += dt
             else:
-                h_l = 0
-                Q_out = 0
-                Q_net = Q_in
-
-                # increase cylinder temp (no cooling)
-                dT = Q_net / cy.get_heat_capacity()
-                cy.T += dT
-
-                clt_vel = 0
-                m_flow = 0
-                dT_clt = 0
-                T_clt_current += 0
-                Pr_clt = 0
-                Nusselt_num = 0
-                coolant_press_drop = 0
-
-            # axial conduction of heat (positive direction is from nozzle exit towards injector face)
-            if cylinders.index(cy) - 1 >= 0:
-                cy_upper = cylinders[cylinders.index(cy) - 1]
-                A_axial = get_area_of_sector(
-                    cy.r_in, cy.r_out, 360) - (cy.A_cochan_flow * n_cochan)
-                k_axial = cy.mtl.get_thermal_conductivity(cy.T)
-                dx_axial = cy.h
-                dT_axial = cy.T - cy_upper.T
-                # print(A_axial, k_axial, dx_axial, dT_axial)
-                Q_axial = (k_axial * A_axial * dT_axial / dx_axial) * time_step
-                cy.T -= Q_axial / cy.get_heat_capacity()
-                cy_upper.T += Q_axial / cy.get_heat_capacity()
+                dt = time_step
+                solver.step(dt)
+                time = (t_step + 1) * time_step
+
+            t_step += 1
 
             # record data for plotting
-            if t_step == 0:
-                xs.insert(0, cy.x)
-                T_gases.insert(0, T_gas)
-                flow_areas.insert(0, flow_area)
-                wet_perimeters.insert(0, wet_perimeter)
-                D_hydros.insert(0, D_hydro)
-                mdot_clts.insert(0, mdot_clt_current)
-            if t_step % 100 == 0:
-                Q_ins[j].insert(0, Q_in / time_step)  # convert to W
-                Q_in_per_areas[j].insert(0, Q_in_per_area)
-                Q_outs[j].insert(0, Q_out / time_step)  # convert to W
-                cylinder_temps[j].insert(0, cy.T - 273)  # convert to celcius
-                cylinder_temps_out[j].insert(0, cy.T - cy.T_diff / 2 -
-                                             273)  # convert to celcius
-                cylinder_temps_in[j].insert(0, cy.T + cy.T_diff / 2 -
-                                            273)  # convert to celcius
-                coolant_temps[j].insert(0, T_clt_current -
-                                        273)  # convert to celcius
-                coolant_presses[j].insert(0, P_clt_current)
-                Reynolds[j].insert(0, Reynolds_num)
-                Nusselts[j].insert(0, Nusselt_num)
-                h_gs[j].insert(0, h_g)
-                h_ls[j].insert(0, h_l)
-                clt_vels[j].insert(0, clt_vel)
-                rT_layers_plot[j].insert(0, rT_layers[i_cylinder_regen])
-                T_effectives[j].insert(0, T_effective)
-                coolant_press_drops[j].insert(0, coolant_press_drop)
-
-        if t_step % 100 == 0:
-            Q_in_fulls.append(Q_in_full)
-            Q_out_fulls.append(Q_out_full)
-            total_clt_press_drops.append(total_clt_press_drop)
-
-        # proceed to next time step
-        time += time_step
-        if t_step % 100 == 0:
-            j += 1
-
-            clear_cmd_terminal()
-            print("")
-            print("= = = SINGLE THERMAL ANALYSIS = = =")
-            print("")
-            print("Current analysis:")
-            print(generate_progress_bar((t_step / n_steps) * 100))
+            recorded = False
+            if (time >= t_sample - 1e-9 * sample_interval or
+                    sample_every_steps and t_step % sample_every_steps == 0):
+                recorder.record(get_snapshot(solver, time))
+                recorded = True
+                while t_sample <= time + 1e-9 * sample_interval:
+                    t_sample += sample_interval
+
+            if probe_recorder and time >= t_probe - 1e-9 * probe_interval:
+                probe_recorder.record(get_snapshot(solver, time))
+                while t_probe <= time + 1e-9 * probe_interval:
+                    t_probe += probe_interval
+
+            # stop early if nothing changes anymore
+            if tol_steady and monitor.update(segs.T, dt, solver.Q_in.sum(),
+                                             solver.Q_out.sum()):
+                time_steady = time
+                break
+
+            if checkpoint_interval and (monotonic() - t_checkpoint >=
+                                        checkpoint_interval):
+                save_checkpoint(checkpoint_filename, get_checkpoint())
+                t_checkpoint = monotonic()
+
+            if reporter:
+                reporter.report(t_step, time, time_end, segs.T)
+
+        # always keep the final state
+        if not recorded:
+            recorder.record(get_snapshot(solver, time))
+            recorded = True
+
+        if reporter:
+            reporter.report(t_step, time, time_end, segs.T, True)
+
+        if verbose and time_steady is not None:
+            print("Steady state reached at t =", round(time_steady, 9), "s.")
+
+        # lets a finished run be extended to a later time_end
+        if checkpoint_interval:
+            save_checkpoint(checkpoint_filename, get_checkpoint())
+
+    if snapshot_store == "disk":
+        recorder.close()
+        if probe_recorder:
+            probe_recorder.close()
+
+    results = analysis_results(config, geom_x, geom_y, engine_lengths,
+                               vis_model, segs, solver, T_gases, time_steady,
+                               probe_xs, recorder, probe_recorder, folder_name)
+    put_cached(results_cache, "results", config, param_names, results)
+
+    return results
+
+
+def analyze_ensemble(configs,
+                     verbose=False,
+                     progress=None,
+                     progress_interval=0.5,
+                     cache=None):
+    """Runs the transient analyses of several designs together with an
+    ensemble_solver, and returns a list of their analysis_results.
+
+    This is meant for parametric studies: the designs may differ in anything
+    but their analysis inputs (see ensemble_inputs). All designs must share
+    the mesh, i.e. have the same number of stations (fineness_vertical), as
+    their stations are marched together. Adaptive time steps, steady state
+    analyses, disk snapshot stores, checkpoints, mesh refinement and radial
+    wall nodes are not available for ensembles. With a steady state
+    tolerance, the run stops once every design has converged. Designs with a
+    warm start file start from the wall temps. in it.
+
+    :param configs: analysis_config of every design
+    :param verbose: print what is being done and ask before giving up (Default value = False)
+    :param progress: function that takes a ui.progress_event (Default value = None)
+    :param progress_interval: min. real time between progress calls (Default value = 0.5)
+    :param cache: result_cache for the contour, 3D model and Mach distribution (Default value = None)
+
+    """
+    for config in configs[1:]:
+        for name in ensemble_inputs:
+            if getattr(config, name) != getattr(configs[0], name):
+                raise ValueError("All designs of an ensemble need the same " +
+                                 name)
+
+    params = configs[0].get_params()
+
+    time_end = params[39]  # s
+    time_step = params[40]  # s
+    tol_steady = get_optional_param(params, "tol_steady", None)  # K s-1
+    sample_interval = get_optional_param(params, "sample_interval",
+                                         100 * time_step)  # s
+    sample_every_steps = get_optional_param(params, "sample_every_steps", None)
+    probe_interval = get_optional_param(params, "probe_interval",
+                                        time_step)  # s
+
+    if get_optional_param(params, "analysis_mode", "transient") != "transient":
+        raise ValueError("Ensembles can only run transient analyses")
+    if get_optional_param(params, "tol_adaptive", None):
+        raise ValueError("Ensembles can't use adaptive time steps")
+    if get_optional_param(params, "snapshot_store", "memory") != "memory":
+        raise ValueError("Ensembles keep their snapshots in memory")
+    if get_optional_param(params, "checkpoint_interval", None):
+        raise ValueError("Ensembles can't write checkpoints")
+    for config in configs:
+        if get_optional_param(config.get_params(), "refine_levels", 0):
+            raise ValueError("Ensembles can't refine their meshes")
+        if get_optional_param(config.get_params(), "wall_nodes", 1) > 1:
+            raise ValueError("Ensembles can't resolve the wall radially")
+
+    models = [build_model(config, verbose, cache) for config in configs]
+    solvers = [model[5] for model in models]
+    for config, solver in zip(configs, solvers):
+        warm_start = get_warm_start(config)
+        if warm_start is not None:
+            solver.warm_start(warm_start)
+    ensemble = ensemble_solver(solvers)
+    n_designs = len(solvers)
+
+    n_snapshots = get_n_snapshots(time_end, time_step, sample_interval,
+                                  sample_every_steps)
+    n_probe_snapshots = int(math.ceil(time_end / probe_interval)) + 1
+
+    recorders = []
+    probe_recorders = []
+    probe_xs = []
+    for config, solver in zip(configs, solvers):
+        recorders.append(snapshot_recorder(n_snapshots, len(solver.segs)))
+
+        design_probe_xs = get_probe_locations(
+            get_optional_param(config.get_params(), "probe_text", ""),
+            solver.x_thrt,
+            solver.film_injects)
+        i_probes = [solver.segs.get_index_at(x) for x in design_probe_xs]
+        probe_xs.append([float(solver.segs.x[i]) for i in i_probes])
+        if i_probes:
+            probe_recorders.append(
+                snapshot_recorder(n_probe_snapshots, len(solver.segs),
+                                  i_probes))
+        else:
+            probe_recorders.append(None)
+
+    if progress:
+        reporter = progress_reporter(progress, progress_interval)
+    else:
+        reporter = None
+
+    if tol_steady:
+        monitors = [convergence_monitor(tol_steady) for k in range(n_designs)]
+    times_steady = [None] * n_designs
+
+    if verbose:
+        print("Running", n_designs, "designs...")
+
+    time = 0
+    t_step = 0
+    t_sample = math.inf if sample_every_steps else sample_interval
+    t_probe = probe_interval
+    recorded = True
+    T_gases = [solver.T_gas.tolist() for solver in solvers]
+
+    while time < time_end - 1e-9 * time_step:
+        ensemble.step(time_step)
+        t_step += 1
+        time = t_step * time_step
+
+        # the member solvers only get the results when they are recorded
+        recorded = (time >= t_sample - 1e-9 * sample_interval
+                    or sample_every_steps and t_step % sample_every_steps == 0)
+        probed = time >= t_probe - 1e-9 * probe_interval
+        if recorded or probed:
+            ensemble.split()
+
+        if recorded:
+            for solver, recorder in zip(solvers, recorders):
+                recorder.record(get_snapshot(solver, time))
+            while t_sample <= time + 1e-9 * sample_interval:
+                t_sample += sample_interval
+
+        if probed:
+            for solver, probe_recorder in zip(solvers, probe_recorders):
+                if probe_recorder:
+                    probe_recorder.record(get_snapshot(solver, time))
+            while t_probe <= time + 1e-9 * probe_interval:
+                t_probe += probe_interval
+
+        # stop early once every design has reached steady state
+        if tol_steady:
+            for k, monitor in enumerate(monitors):
+                if (monitor.update(ensemble.T[k], time_step,
+                                   ensemble.Q_in[k].sum(),
+                                   ensemble.Q_out[k].sum())
+                        and times_steady[k] is None):
+                    times_steady[k] = time
+            if None not in times_steady:
+                break
+
+        if reporter:
+            reporter.report(t_step, time, time_end, ensemble.T)
+
+    # always keep the final state
+    ensemble.split()
+    if not recorded:
+        for solver, recorder in zip(solvers, recorders):
+            recorder.record(get_snapshot(solver, time))
+
+    if reporter:
+        reporter.report(t_step, time, time_end, ensemble.T, True)
+
+    results = []
+    for k, (config, model) in enumerate(zip(configs, models)):
+        geom_x, geom_y, engine_lengths, vis_model, segs, solver = model
+        results.append(
+            analysis_results(config, geom_x, geom_y, engine_lengths,
+                             vis_model, segs, solver, T_gases[k],
+                             times_steady[k], probe_xs[k], recorders[k],
+                             probe_recorders[k], None))
+
+    return results
+
+
+def perform(params, config_filename=None, getchar=True, restart_filename=None):
+    """
+
+    :param params:
+    :param config_filename:  (Default value = None)
+    :param getchar:  (Default value = True)
+    :param restart_filename: checkpoint to resume the analysis from (Default value = None)
+
+    """
+    print("")
+    print("= = = SINGLE THERMAL ANALYSIS = = =")
+    print("")
+
+    # results are only kept on disk if the design asks for it
+    if get_optional_param(params, "result_cache", 0):
+        cache = result_cache()
+    else:
+        cache = None
+
+    try:
+        results = analyze(
+            config_from_params(params),
+            get_folder_name(config_filename),
+            restart_filename,
+            verbose=True,
+            progress=print_progress,
+            cache=cache,
+        )
+    except (ValueError, RuntimeError) as error:
+        print("ERROR: " + str(error))
+        quit()
 
     plot_data(
-        time_step,
-        xs,
-        cylinder_temps,
-        cylinder_temps_out,
-        cylinder_temps_in,
-        coolant_temps,
-        coolant_presses,
-        Q_ins,
-        Q_in_per_areas,
-        Q_outs,
-        Reynolds,
-        Nusselts,
-        T_gases,
-        h_gs,
-        h_ls,
-        clt_vels,
-        Q_in_fulls,
-        Q_out_fulls,
-        geom_x,
-        geom_y,
-        flow_areas,
-        wet_perimeters,
-        D_hydros,
-        m_engine,
-        L_skirt_chan_width,
-        L_chamber_chan_width,
-        L_min_chan_width,
-        L_max_chan_width,
-        engine_lengths,
-        mdot_clts,
-        T_films,
-        rT_layers_plot,
-        T_effectives,
-        coolant_press_drops,
-        total_clt_press_drops,
-        vis_model,
+        results.config.time_step,
+        results.xs,
+        results.get("cylinder_temps"),
+        results.get("cylinder_temps_out"),
+        results.get("cylinder_temps_in"),
+        results.get("coolant_temps"),
+        results.get("coolant_presses"),
+        results.get("Q_ins"),
+        results.get("Q_in_per_areas"),
+        results.get("Q_outs"),
+        results.get("Reynolds"),
+        results.get("Nusselts"),
+        results.T_gases,
+        results.get("h_gs"),
+        results.get("h_ls"),
+        results.get("clt_vels"),
+        results.get("Q_in_fulls"),
+        results.get("Q_out_fulls"),
+        results.geom_x,
+        results.geom_y,
+        results.flow_areas,
+        results.wet_perimeters,
+        results.D_hydros,
+        results.m_engine,
+        results.L_skirt_chan_width,
+        results.L_chamber_chan_width,
+        results.L_min_chan_width,
+        results.L_max_chan_width,
+        results.engine_lengths,
+        results.mdot_clts,
+        results.get("T_films"),
+        results.get("rT_layers_plot"),
+        results.get("T_effectives"),
+        results.get("coolant_press_drops"),
+        results.get("total_clt_press_drops"),
+        results.vis_model,
         config_filename,
+        results.time_steady,
+        results.probe_xs,
+        results.get_probes(),
+        results.folder_name,
     )
 
     if getchar:
@@ -0,0 +1,125 @@
+# - - - - - - - - - - - - - - - - - - - -
+# RESULT CACHE
+# - - - - - - - - - - - - - - - - - - - -
+# Keeps the results of analysis stages on
+# disk, so that repeated analyses of the
+# same inputs don't compute them again.
+# - - - - - - - - - - - - - - - - - - - -
+import hashlib
+import os
+import pickle
+
+from solver import solver_version
+
+
+def get_normalised_value(value):
+    """Returns an input value in a form that doesn't depend on how it was
+    typed in (1 and 1.0 give the same key).
+
+    :param value:
+
+    """
+    if isinstance(value, str):
+        return value
+    return float(value)
+
+
+class result_cache:
+    """Stores the results of analysis stages as files in a folder, keyed on
+    a hash of the stage name, the solver version and the (unit-normalised)
+    input values the stage depends on.
+
+    Every cache hit marks its file as recently used. Once the files take up
+    more than max_size MB, the least recently used ones are deleted.
+    """
+
+    def __init__(self, folder_name="cache", max_size=500):
+        """
+
+        :param folder_name:  (Default value = "cache")
+        :param max_size: max. size of the cache in MB (Default value = 500)
+
+        """
+        self.folder_name = folder_name
+        self.max_size = max_size
+
+    def get_path(self, stage, values):
+        """Returns the file a stage result is kept in.
+
+        :param stage:
+        :param values: input values the stage depends on
+
+        """
+        key = repr((stage, solver_version,
+                    [get_normalised_value(value) for value in values]))
+        return os.path.join(
+            self.folder_name,
+            stage + "_" + hashlib.sha256(key.encode()).hexdigest() + ".pkl")
+
+    def get(self, stage, values):
+        """Returns the cached result of a stage, or None.
+
+        :param stage:
+        :param values: input values the stage depends on
+
+        """
+        path = self.get_path(stage, values)
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            os.utime(path)  # least recently used files go first
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        return data
+
+    def put(self, stage, values, data):
+        """Stores the result of a stage.
+
+        :param stage:
+        :param values: input values the stage depends on
+        :param data: anything that can be pickled
+
+        """
+        if not os.path.exists(self.folder_name):
+            os.makedirs(self.folder_name, exist_ok=True)
+
+        # other processes (sweeps) may read the same file at the same time
+        path = self.get_path(stage, values)
+        temp_path = path + "." + str(os.getpid()) + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Deletes the least recently used files until the cache fits into
+        max_size."""
+        files = []
+        for filename in os.listdir(self.folder_name):
+            if not filename.endswith(".pkl"):
+                continue
+            path = os.path.join(self.folder_name, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(file_size for mtime, file_size, path in files)
+        for mtime, file_size, path in sorted(files):
+            if size <= self.max_size * 2**20:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= file_size
+
+    def clear(self):
+        """Deletes every cached result."""
+        if os.path.exists(self.folder_name):
+            for filename in os.listdir(self.folder_name):
+                if filename.endswith(".pkl"):
+                    os.remove(os.path.join(self.folder_name, filename))
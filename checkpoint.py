@@ -0,0 +1,54 @@
+# - - - - - - - - - - - - - - - - - - - -
+# CHECKPOINTS
+# - - - - - - - - - - - - - - - - - - - -
+# Saves and loads the state of a running
+# analysis, so that it can be resumed
+# after a crash or extended later on.
+# - - - - - - - - - - - - - - - - - - - -
+import os
+
+import numpy
+
+
+def save_checkpoint(filename, state):
+    """Writes a checkpoint file (.npz).
+
+    state is a dict of dicts (e.g. {"solver": solver.get_state(), ...}) whose
+    values are numbers or arrays. The file is written next to the old one
+    first, so a crash while saving never destroys the previous checkpoint.
+
+    :param filename:
+    :param state:
+
+    """
+    arrays = {}
+    for part, part_state in state.items():
+        for name, value in part_state.items():
+            arrays[part + "/" + name] = numpy.asarray(value)
+
+    if os.path.dirname(filename) and not os.path.exists(
+            os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+
+    temp_filename = filename + ".tmp.npz"
+    numpy.savez(temp_filename, **arrays)
+    os.replace(temp_filename, filename)
+
+
+def load_checkpoint(filename):
+    """Reads a checkpoint file written by save_checkpoint() back into a dict
+    of dicts. Single numbers are returned as Python floats/ints.
+
+    :param filename:
+
+    """
+    state = {}
+    with numpy.load(filename) as arrays:
+        for key in arrays.files:
+            part, name = key.split("/", 1)
+            value = arrays[key]
+            if value.ndim == 0:
+                value = value.item()
+            state.setdefault(part, {})[name] = value
+
+    return state
@@ -0,0 +1,206 @@
+# - - - - - - - - - - - - - - - - - - - -
+# ANALYSIS CONFIGURATION
+# - - - - - - - - - - - - - - - - - - - -
+# Named analysis inputs, so that analyses
+# can be set up from scripts instead of
+# the GUI's positional input list.
+# - - - - - - - - - - - - - - - - - - - -
+from unit_converter import convert_unit
+from unit_converter import units
+
+# names of the inputs, in the order of the GUI's input list (params)
+param_names = [
+    # - - - ENGINE GEOMETRY - - -
+    "L_engine",  # m
+    "D_chm",  # m
+    "D_thrt",  # m
+    "D_exit",  # m
+    "a_chmContract",  # deg
+    "ROC_chm",  # m
+    "type_nozzle",  # 'bell' or 'conic'
+    "a_nzlExp",  # deg
+    "ROC_thrtDn",  # m
+    "ROC_thrtUp",  # m
+    "percentLength_nzl",  # %
+    "theta_n_nzl",  # deg
+    "theta_e_nzl",  # deg
+    # - - - COOLING SYSTEM - - -
+    "n_cochan",
+    "L_cochanInnerWallDist",  # m
+    "L_cochanTangentialWidth",  # m
+    "L_cochanDepth",  # m
+    "L_filmInject1",  # m
+    "mdot_filmInject1",  # kg s-1
+    "L_filmInject2",  # m
+    "mdot_filmInject2",  # kg s-1
+    # - - - COMBUSTION / CEA - - -
+    "mdot_chamber",  # kg s-1
+    "P_c",  # Pa
+    "T_c",  # K
+    "c_star",  # m s-1
+    "gasConductivity",  # W m-1 K-1
+    "avgMolecularMass",  # g mol-1
+    "T_w",  # K, initial wall temp.
+    "visc_chm",  # millipoise
+    "gamma_chm",
+    "visc_thrt",  # millipoise
+    "gamma_thrt",
+    # - - - MATERIALS - - -
+    "mtl_innerWall",  # 'SS' or 'CCZ'
+    "mtl_outerShell",  # 'SS' or 'CCZ'
+    "mtl_clt",  # 'Jet_A1'
+    "mdot_clt",  # kg s-1 (all channels)
+    "T_clt",  # K
+    "P_clt",  # Pa
+    # - - - ANALYSIS - - -
+    "fineness_vertical",
+    "time_end",  # s
+    "time_step",  # s
+    "time_integrator",  # 'explicit', 'implicit' or 'cn'
+    "analysis_mode",  # 'transient' or 'steady'
+    "tol_steady",  # K s-1
+    "tol_adaptive",  # K
+    "time_step_min",  # s
+    "time_step_max",  # s
+    "sample_interval",  # s
+    "probe_text",  # comma separated x positions, 'throat' or 'film'
+    "probe_interval",  # s
+    "snapshot_store",  # 'memory' or 'disk'
+    "checkpoint_interval",  # s (real time)
+    "film_tol",  # K
+    "coolant_interval",  # number of steps
+    "coolant_tol",  # K
+    "kernel_backend",  # 'python' or 'numba'
+    "warm_start_file",  # checkpoint (.npz) of a previous run
+    "mesh_grading",  # max. / min. station height
+    "refine_levels",  # number of times a station may be split
+    "refine_tol",  # relative change between neighbouring stations
+    "wall_nodes",  # radial nodes per station (1, or at least 3)
+    "L_outerShellThickness",  # m
+    "sample_every_steps",  # number of steps, instead of sample_interval
+    "result_cache",  # 1 to reuse the results of GUI runs (kept in ./cache)
+    "film_injects_text",  # more film injectors, comma separated 'x:mdot' (m:kg s-1)
+]
+
+# inputs that are read as integers and as text
+int_params = [
+    "n_cochan",
+    "fineness_vertical",
+    "coolant_interval",
+    "refine_levels",
+    "wall_nodes",
+    "sample_every_steps",
+    "result_cache",
+]
+string_params = [
+    "type_nozzle",
+    "mtl_innerWall",
+    "mtl_outerShell",
+    "mtl_clt",
+    "time_integrator",
+    "analysis_mode",
+    "probe_text",
+    "snapshot_store",
+    "kernel_backend",
+    "warm_start_file",
+    "film_injects_text",
+]
+
+# units the analysis works with, by unit type
+analysis_units = {
+    "length": "m",
+    "angle": "deg",
+    "mass flow": "kg/s",
+    "pressure": "Pa",
+    "temperature": "K",
+    "velocity": "m/s",
+    "thermal conductivity": "W/(m*K)",
+    "molecular mass": "g/mol",
+    "viscosity": "millipoise",
+    "time": "s",
+}
+
+
+class analysis_config:
+    """Inputs of an analysis, by name (see param_names). Inputs that are not
+    given are 0, which the analysis treats as 'left empty' like the GUI does.
+    """
+
+    def __init__(self, **values):
+        """
+
+        :param values: input name -> value, in the units of param_names
+
+        """
+        for name in values:
+            if name not in param_names:
+                raise ValueError("Unknown analysis input '" + name + "'")
+
+        for name in param_names:
+            setattr(self, name, values.get(name, 0))
+
+    def get_params(self):
+        """Returns the inputs as the GUI's positional input list."""
+        return [getattr(self, name) for name in param_names]
+
+
+def config_from_params(params):
+    """Returns the analysis_config of a GUI input list.
+
+    :param params:
+
+    """
+    return analysis_config(**dict(zip(param_names, params)))
+
+
+def get_analysis_unit_value(value, unit):
+    """Converts a value from a design file unit to the unit the analysis
+    works with. Values of unknown units (%, unitless, ...) are kept.
+
+    :param value:
+    :param unit:
+
+    """
+    for unit_list in units:
+        for j in unit_list:
+            if unit == j.short_name and j.type in analysis_units:
+                return convert_unit(value, unit, analysis_units[j.type])
+
+    return value
+
+
+def read_config_file(filename):
+    """Reads a design file (.lpre) exported by the GUI.
+
+    Each line is '<label> <value> <unit>', in the order of param_names.
+    Design files from older versions may not have the newer (optional)
+    inputs, those are left empty.
+
+    :param filename:
+
+    """
+    with open(filename, "r") as f:
+        lines = f.read().splitlines()
+
+    values = {}
+    for name, line in zip(param_names, lines):
+        words = line.split(" ")
+        if line.endswith("# (unitless)"):
+            unit = "# (unitless)"
+            value_text = words[-3]
+        else:
+            unit = words[-1]
+            value_text = words[-2]
+
+        if name in string_params:
+            value = value_text
+        elif value_text == "":
+            value = 0
+        elif name in int_params:
+            value = int(float(value_text))
+        else:
+            value = get_analysis_unit_value(float(value_text), unit)
+
+        values[name] = value
+
+    return analysis_config(**values)
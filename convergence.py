@@ -0,0 +1,338 @@
+# - - - - - - - - - - - - - - - - - - - -
+# CONVERGENCE STUDIES
+# - - - - - - - - - - - - - - - - - - - -
+# Runs a design on successively finer
+# meshes and time steps (in parallel),
+# estimates the exact results by
+# Richardson extrapolation and picks the
+# cheapest settings that are accurate
+# enough.
+#
+# python convergence.py base.lpre --levels 4 --tol 0.005
+# - - - - - - - - - - - - - - - - - - - -
+import argparse
+import copy
+import math
+import os
+
+from config import read_config_file
+from sweep import run_sweep
+from sweep import summary_columns
+
+# results that are checked for convergence (see sweep.summary_columns)
+study_metrics = ["T_wall_max", "T_clt_out", "press_drop"]
+
+# the analysis input every ladder refines
+ladder_inputs = {"grid": "fineness_vertical", "time": "time_step"}
+
+
+def get_ladder_variants(base_config, n_levels=3, ratio=2):
+    """Returns the grid and the time step ladder of a design, as dicts of
+    ladder name -> list of (name, analysis_config), coarsest first.
+
+    The grid ladder multiplies the number of stations by ratio at every
+    level, the time step ladder divides the time step by ratio. Both start
+    from the settings of base_config, which is the first level of both.
+    Steady state and adaptive time step analyses have no time step ladder.
+
+    :param base_config: analysis_config
+    :param n_levels: number of levels of each ladder (Default value = 3)
+    :param ratio: refinement ratio between levels (Default value = 2)
+
+    """
+    base_config = copy.copy(base_config)
+
+    # keep the snapshots at the same times on every level, so that the peak
+    # wall temp. is taken from the same moments
+    if not base_config.sample_interval:
+        base_config.sample_interval = 100 * base_config.time_step
+    base_config.sample_every_steps = 0
+
+    ladders = {"grid": [], "time": []}
+    for level in range(n_levels):
+        config = copy.copy(base_config)
+        config.fineness_vertical = base_config.fineness_vertical * ratio**level
+        ladders["grid"].append(
+            ("grid_" + str(config.fineness_vertical), config))
+
+    if base_config.analysis_mode == "steady" or base_config.tol_adaptive:
+        print("WARNING: The time step ladder is skipped for steady state and "
+              "adaptive time step analyses")
+    else:
+        for level in range(n_levels):
+            config = copy.copy(base_config)
+            config.time_step = base_config.time_step / ratio**level
+            ladders["time"].append(("time_" + str(config.time_step), config))
+
+    return ladders
+
+
+def get_richardson(values, ratio):
+    """Returns the observed order of convergence and the Richardson
+    extrapolated value of a result computed on successively refined levels
+    (coarsest first), from the three finest levels.
+
+    Both are None if there are less than three levels, or if the result
+    doesn't converge monotonically on them.
+
+    :param values:
+    :param ratio: refinement ratio between levels
+
+    """
+    if len(values) < 3 or None in values[-3:]:
+        return None, None
+
+    f_coarse, f_medium, f_fine = values[-3:]
+    if f_medium == f_fine:
+        return None, f_fine
+
+    change_ratio = (f_coarse - f_medium) / (f_medium - f_fine)
+    if change_ratio <= 1:
+        # oscillating or diverging
+        return None, None
+
+    order = math.log(change_ratio) / math.log(ratio)
+    f_exact = f_fine + (f_fine - f_medium) / (ratio**order - 1)
+
+    return order, f_exact
+
+
+def get_recommended_level(summaries, extrapolated, tol):
+    """Returns the index of the coarsest level whose results are all within
+    tol (relative) of the extrapolated values, or None. Results that can't
+    be extrapolated are compared to the finest level instead.
+
+    :param summaries: run summary of every level (see sweep.get_run_summary())
+    :param extrapolated: metric name -> extrapolated value (or None)
+    :param tol:
+
+    """
+    if summaries[-1] is None:
+        return None
+
+    for level, summary in enumerate(summaries):
+        if summary is None:
+            continue
+
+        converged = True
+        for name in study_metrics:
+            f_exact = extrapolated[name]
+            if f_exact is None:
+                f_exact = summaries[-1][name]
+            if f_exact is None or summary[name] is None:
+                converged = False
+            elif abs(summary[name] - f_exact) > tol * abs(f_exact):
+                converged = False
+
+        if converged:
+            return level
+
+    return None
+
+
+def run_convergence_study(base_config,
+                          n_levels=3,
+                          ratio=2,
+                          tol=0.01,
+                          n_workers=None,
+                          folder_name="convergence",
+                          cache_folder=None):
+    """Runs the grid and the time step ladder of a design on a pool of
+    worker processes and returns a dict of ladder name -> dict with
+
+        "variants": list of (name, analysis_config), coarsest first
+        "summaries": run summary of every level (None if it failed)
+        "errors": error message of every level that failed
+        "orders": metric name -> observed order of convergence
+        "extrapolated": metric name -> Richardson extrapolated value
+        "recommended": index of the cheapest level within tol, or None
+
+    :param base_config: analysis_config
+    :param n_levels:  (Default value = 3)
+    :param ratio:  (Default value = 2)
+    :param tol: relative error the recommended level must meet (Default value = 0.01)
+    :param n_workers:  (Default value = None)
+    :param folder_name:  (Default value = "convergence")
+    :param cache_folder: result_cache folder (Default value = None)
+
+    """
+    ladders = get_ladder_variants(base_config, n_levels, ratio)
+
+    # the first level of both ladders is the same run
+    variants = ladders["grid"] + ladders["time"][1:]
+    rows = {}
+    for name, summary, error in run_sweep(variants,
+                                          n_workers,
+                                          folder_name,
+                                          cache_folder=cache_folder):
+        rows[name] = (summary, error)
+    if ladders["time"]:
+        rows[ladders["time"][0][0]] = rows[ladders["grid"][0][0]]
+
+    study = {}
+    for ladder_name, ladder in ladders.items():
+        if not ladder:
+            continue
+
+        summaries = [rows[name][0] for name, config in ladder]
+        orders = {}
+        extrapolated = {}
+        for name in study_metrics:
+            orders[name], extrapolated[name] = get_richardson(
+                [None if s is None else s[name] for s in summaries], ratio)
+
+        study[ladder_name] = {
+            "variants": ladder,
+            "summaries": summaries,
+            "errors": [rows[name][1] for name, config in ladder],
+            "orders": orders,
+            "extrapolated": extrapolated,
+            "recommended": get_recommended_level(summaries, extrapolated,
+                                                 tol),
+        }
+
+    return study
+
+
+def print_convergence_study(study, tol):
+    """Prints the results of run_convergence_study() as one table per
+    ladder, followed by the recommended setting.
+
+    :param study:
+    :param tol:
+
+    """
+    labels = dict(summary_columns)
+
+    for ladder_name, ladder in study.items():
+        input_name = ladder_inputs[ladder_name]
+        print("")
+        print("= = = " + ladder_name.upper() + " CONVERGENCE (" + input_name +
+              ") = = =")
+
+        print(input_name.ljust(20) +
+              "".join(labels[name].rjust(34) for name in study_metrics))
+        for (name, config), summary, error in zip(ladder["variants"],
+                                                  ladder["summaries"],
+                                                  ladder["errors"]):
+            line = str(getattr(config, input_name)).ljust(20)
+            if summary is None:
+                line += "  ERROR: " + error
+            else:
+                line += "".join(
+                    ("%.6g" % summary[name]).rjust(34)
+                    for name in study_metrics)
+            print(line)
+
+        line = "observed order".ljust(20)
+        for name in study_metrics:
+            order = ladder["orders"][name]
+            line += ("-" if order is None else "%.2f" % order).rjust(34)
+        print(line)
+
+        line = "extrapolated".ljust(20)
+        for name in study_metrics:
+            value = ladder["extrapolated"][name]
+            line += ("-" if value is None else "%.6g" % value).rjust(34)
+        print(line)
+        if None in ladder["extrapolated"].values():
+            print("WARNING: Some results don't converge monotonically, they "
+                  "are compared to the finest level instead")
+
+        if ladder["recommended"] is None:
+            print("No level is within " + str(tol * 100) +
+                  "% of the extrapolated results, refine further.")
+        else:
+            config = ladder["variants"][ladder["recommended"]][1]
+            print("Recommended: " + input_name + " = " +
+                  str(getattr(config, input_name)) + " (within " +
+                  str(tol * 100) + "% of the extrapolated results)")
+
+
+def write_convergence_table(filename, study):
+    """Writes the results of run_convergence_study() into a .csv file, one
+    line per level, followed by the extrapolated values of every ladder.
+
+    :param filename:
+    :param study:
+
+    """
+    labels = dict(summary_columns)
+
+    with open(filename, "w") as f:
+        f.write("ladder, setting")
+        for name in study_metrics:
+            f.write(", " + labels[name])
+        f.write(", error\n")
+
+        for ladder_name, ladder in study.items():
+            input_name = ladder_inputs[ladder_name]
+            for (name, config), summary, error in zip(ladder["variants"],
+                                                      ladder["summaries"],
+                                                      ladder["errors"]):
+                f.write(ladder_name + ", " + str(getattr(config, input_name)))
+                for name in study_metrics:
+                    f.write(", " +
+                            ("" if summary is None else str(summary[name])))
+                f.write(", " + (error or "").replace(",", ";") + "\n")
+
+            f.write(ladder_name + ", extrapolated")
+            for name in study_metrics:
+                value = ladder["extrapolated"][name]
+                f.write(", " + ("" if value is None else str(value)))
+            f.write(", \n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs a grid and time step convergence study of a design.")
+    parser.add_argument("design", help="design file (.lpre)")
+    parser.add_argument("--levels",
+                        type=int,
+                        default=3,
+                        help="number of levels of each ladder (default: 3)")
+    parser.add_argument("--ratio",
+                        type=int,
+                        default=2,
+                        help="refinement ratio between levels (default: 2)")
+    parser.add_argument(
+        "--tol",
+        type=float,
+        default=0.01,
+        help="relative error the recommended settings must meet "
+        "(default: 0.01)",
+    )
+    parser.add_argument("--workers",
+                        type=int,
+                        default=None,
+                        help="number of processes (default: number of cores)")
+    parser.add_argument("--cache",
+                        default=None,
+                        metavar="FOLDER",
+                        help="keep the results in a cache folder and reuse "
+                        "them in later studies")
+    parser.add_argument("--out",
+                        default="convergence",
+                        help="output folder (default: convergence)")
+    args = parser.parse_args()
+
+    if args.levels < 3:
+        print("WARNING: Richardson extrapolation needs at least 3 levels")
+
+    try:
+        base_config = read_config_file(args.design)
+    except ValueError as error:
+        print("ERROR: " + str(error))
+        quit()
+
+    study = run_convergence_study(base_config, args.levels, args.ratio,
+                                  args.tol, args.workers, args.out,
+                                  args.cache)
+    print_convergence_study(study, args.tol)
+
+    if not os.path.exists(args.out):
+        os.makedirs(args.out)
+    table_filename = os.path.join(args.out, "convergence.csv")
+    write_convergence_table(table_filename, study)
+    print("")
+    print("Results written to", table_filename)
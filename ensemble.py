@@ -0,0 +1,541 @@
+# - - - - - - - - - - - - - - - - - - - -
+# ENSEMBLE SOLVER
+# - - - - - - - - - - - - - - - - - - - -
+# Advances several design variants with
+# the same number of stations together,
+# with a leading design axis on every
+# per-station array.
+# - - - - - - - - - - - - - - - - - - - -
+import numpy
+
+from kernels import march_coolant_ensemble_kernel
+from solver import coolant_results
+from solver import get_film_mixing_temps
+
+# per-station arrays of the wall_segments and of the transient_solvers that
+# are stacked into (design x station) arrays
+segs_arrays = [
+    "T",
+    "T_diff",
+    "h",
+    "thickness",
+    "m",
+    "A_chm",
+    "A_clt",
+    "A_axial",
+    "dx_axial",
+]
+solver_arrays = [
+    "h_l",
+    "mdot_clts",
+    "flow_area",
+    "D_hydro",
+    "is_filmInject",
+    "T_gas",
+    "sigma_num",
+    "sigma_coeff",
+    "mdot_films",
+    "mdot_injected",
+    "rT_mixing",
+]
+
+# single values of the transient_solvers that become one value per design
+solver_values = ["T_clt", "P_clt", "T_film", "n_cochan", "mdot_clt", "Pr_clt"]
+
+# transient_solver settings every design of an ensemble must share
+shared_settings = ["integrator", "film_tol", "coolant_interval", "coolant_tol"]
+
+# results of a step that are handed back to the member solvers by split()
+step_results = [
+    "Q_in",
+    "Q_out",
+    "Q_in_per_area",
+    "h_g",
+    "T_films",
+    "rT_layers",
+    "T_effective",
+    "film_exists",
+] + coolant_results
+
+
+def shift_stations(values, s, fill):
+    """Returns a (design x station) array moved by s stations towards the
+    nozzle exit (s > 0) or the injector face (s < 0), the stations moved in
+    from outside are set to fill.
+
+    :param values:
+    :param s:
+    :param fill:
+
+    """
+    shifted = numpy.full(values.shape, fill, dtype=float)
+    if s > 0:
+        shifted[:, s:] = values[:, :-s]
+    else:
+        shifted[:, :s] = values[:, -s:]
+    return shifted
+
+
+def solve_tridiagonal_stack(lower, diag, upper, rhs):
+    """Solves a stack of tridiagonal linear systems, one per row of the
+    (design x station) arrays, with parallel cyclic reduction.
+
+    Every reduction step eliminates the neighbours at twice the distance of
+    the step before from all equations at once, so the systems are solved in
+    log2(n) array operations instead of looping over the stations. The
+    systems must be diagonally dominant (which the wall heat balance is).
+
+    :param lower: sub-diagonals (design x n-1)
+    :param diag: main diagonals (design x n)
+    :param upper: super-diagonals (design x n-1)
+    :param rhs: right hand sides (design x n)
+
+    """
+    n = diag.shape[1]
+    a = numpy.zeros(diag.shape)
+    c = numpy.zeros(diag.shape)
+    a[:, 1:] = lower
+    c[:, :-1] = upper
+    b = numpy.array(diag, dtype=float)
+    d = numpy.array(rhs, dtype=float)
+
+    s = 1
+    while s < n:
+        # coefficients of the equations s stations up and down (outside the
+        # system: 1 * x = 0)
+        a_up, b_up, c_up, d_up = [
+            shift_stations(v, s, fill)
+            for v, fill in ((a, 0), (b, 1), (c, 0), (d, 0))
+        ]
+        a_dn, b_dn, c_dn, d_dn = [
+            shift_stations(v, -s, fill)
+            for v, fill in ((a, 0), (b, 1), (c, 0), (d, 0))
+        ]
+
+        k_up = a / b_up
+        k_dn = c / b_dn
+        b = b - k_up * c_up - k_dn * a_dn
+        d = d - k_up * d_up - k_dn * d_dn
+        a = -k_up * a_up
+        c = -k_dn * c_dn
+        s *= 2
+
+    return d / b
+
+
+class ensemble_solver:
+    """Advances the transient_solvers of several designs with the same number
+    of stations together.
+
+    The per-station arrays of all designs are stacked into (design x station)
+    arrays, so that a time step takes about as many array operations as the
+    step of a single design. The film cooling and coolant marches loop over
+    the stations once for all designs. Without numba the cost of these loops
+    still grows with the number of designs, so the speed-up is well below
+    the number of designs, especially with film cooling and few designs.
+
+    The designs may differ in geometry, coolant channels, flows and
+    temperatures, but must use the same wall and coolant materials and the
+    same solver settings (see shared_settings). The film and coolant march
+    results are reused per design exactly like transient_solver does.
+    Adaptive time steps and the steady state solve are not available for
+    ensembles.
+
+    split() hands the state and the results of the last step back to the
+    member solvers, so that they can be recorded like single analyses.
+    """
+
+    def __init__(self, solvers):
+        """
+
+        :param solvers: transient_solver of every design
+
+        """
+        first = solvers[0]
+        for solver in solvers:
+            if len(solver.segs) != len(first.segs):
+                raise ValueError(
+                    "All designs of an ensemble need the same number of stations"
+                )
+            if (solver.segs.mtl.get_name() != first.segs.mtl.get_name()
+                    or solver.mtl_clt.get_name() != first.mtl_clt.get_name()):
+                raise ValueError(
+                    "All designs of an ensemble need the same wall and coolant materials"
+                )
+            for name in shared_settings:
+                if getattr(solver, name) != getattr(first, name):
+                    raise ValueError("All designs of an ensemble need the same " +
+                                     name)
+
+        self.solvers = solvers
+        for name in shared_settings:
+            setattr(self, name, getattr(first, name))
+
+        self.mtl = first.segs.mtl
+        self.mtl_clt = first.mtl_clt
+        self.i_up = first.segs.i_up
+        self.i_dn = first.segs.i_dn
+
+        for name in segs_arrays:
+            setattr(self, name,
+                    numpy.array([getattr(s.segs, name) for s in solvers]))
+        for name in solver_arrays + solver_values:
+            setattr(self, name,
+                    numpy.array([getattr(s, name) for s in solvers]))
+        self.cooled = self.mdot_clt != 0
+        self.has_film = self.mdot_films.any(1)
+
+        # same caches as transient_solver (see there), kept for every design
+        self.film_profile = None
+        self.T_film_marched = None
+        self.T_wall_cooled = None
+        self.n_steps_uncooled = numpy.zeros(len(solvers), dtype=int)
+        self.time_step = None
+
+    def __len__(self):
+        return len(self.solvers)
+
+    def get_heat_capacity(self):
+        """ """
+        return self.mtl.get_specific_heat(self.T) * self.m
+
+    def get_thermal_resistance(self):
+        """ """
+        return self.thickness / (self.mtl.get_thermal_conductivity(self.T) *
+                                 self.A_chm)
+
+    def get_axial_conductances(self):
+        """Returns the axial thermal conductance (W K-1) of every station
+        interface of every design."""
+        k_axial = self.mtl.get_thermal_conductivity(self.T[:, self.i_dn])
+        return k_axial * self.A_axial[:, self.i_dn] / self.dx_axial
+
+    def get_interface_sums(self, up_values, dn_values):
+        """Returns, for every station, the sum of up_values over the
+        interfaces it is the upstream station of and dn_values over the
+        interfaces it is the downstream station of.
+
+        :param up_values: (design x interface) array
+        :param dn_values: (design x interface) array
+
+        """
+        sums = numpy.zeros(self.T.shape)
+        sums[:, self.i_up] = up_values
+        sums[:, self.i_dn] += dn_values
+        return sums
+
+    def conduct_axial(self, time_step):
+        """See transient_solver.conduct_axial().
+
+        :param time_step:
+
+        """
+        dT_axial = self.T[:, self.i_dn] - self.T[:, self.i_up]
+        Q_axial = self.get_axial_conductances() * dT_axial * time_step
+        self.T += (self.get_interface_sums(Q_axial, -Q_axial) /
+                   self.get_heat_capacity())
+
+    def get_h_g(self, T_w):
+        """See transient_solver.get_h_g().
+
+        :param T_w:
+
+        """
+        return self.sigma_num / (self.sigma_coeff * T_w + 0.5)**0.68
+
+    def march_film(self, T_film):
+        """transient_solver.march_film() for all designs at once. Stations
+        without film cooling in any design are skipped.
+
+        :param T_film: film coolant temp. at injection of every design
+
+        """
+        mtl_clt = self.mtl_clt
+        n = self.T.shape[1]
+
+        # station-major copies, so that a station is a contiguous row
+        sigma_nums = self.sigma_num.T.copy()
+        sigma_coeffs = self.sigma_coeff.T.copy()
+        T_gas = self.T_gas.T.copy()
+        A_chms = self.A_chm.T.copy()
+        mdot_injected = self.mdot_injected.T.copy()
+        has_films = self.mdot_films.T > 0
+
+        stability_coeff = 0.6
+        film_capacities = stability_coeff * numpy.where(
+            has_films, self.mdot_films.T, 1)
+
+        film_exists = numpy.zeros((n, len(self)), dtype=bool)
+        vaporised = numpy.zeros((n, len(self)), dtype=bool)
+        T_films = numpy.empty((n, len(self)))
+
+        T_film = numpy.array(T_film, dtype=float)
+        mdot_film_current = numpy.zeros(len(self))
+
+        any_film = has_films.any(1)
+        for i in range(n):
+            # no film yet
+            if not any_film[i]:
+                T_films[i] = T_film
+                continue
+
+            has_film = has_films[i]
+
+            # film injection here
+            mdot_film_current += mdot_injected[i] * has_film
+
+            # calculate heat transfer coeff
+            h_g = sigma_nums[i] / (sigma_coeffs[i] * T_film + 0.5)**0.68
+            Q_film = h_g * (T_gas[i] - T_film) * A_chms[i]
+
+            T_film_heated = T_film + Q_film / (
+                film_capacities[i] * mtl_clt.get_specific_heat(T_film))
+            liquid = has_film & (T_film_heated < 600)
+
+            # check vaporization
+            mdot_film_left = (mdot_film_current -
+                              Q_film / mtl_clt.get_heat_of_vaporization(T_film))
+            boiling = has_film & ~liquid
+            remaining = mdot_film_left > 0
+
+            T_film = numpy.where(liquid, T_film_heated, T_film)
+            film_exists[i] = liquid | (boiling & remaining)
+            vaporised[i] = boiling & ~remaining
+            mdot_film_current = numpy.where(
+                boiling, numpy.where(remaining, mdot_film_left, 0),
+                mdot_film_current)
+
+            T_films[i] = T_film
+
+        rT_layers = numpy.where(vaporised.T, self.rT_mixing, 1.0)
+
+        return film_exists.T.copy(), rT_layers, T_films.T.copy()
+
+    def heat_gas_side(self):
+        """transient_solver.heat_gas_side() for all designs at once."""
+        if self.mdot_films.any():
+            # the film profile of a design is reused until its injection
+            # temp. changes (all designs are marched together, but only the
+            # profiles that have to be updated are)
+            if self.T_film_marched is None:
+                self.film_profile = self.march_film(self.T_film)
+                self.T_film_marched = self.T_film.copy()
+            else:
+                changed = (numpy.abs(self.T_film - self.T_film_marched) >
+                           self.film_tol)
+                if changed.any():
+                    self.film_profile = [
+                        numpy.where(changed[:, None], new, old)
+                        for new, old in zip(self.march_film(self.T_film),
+                                            self.film_profile)
+                    ]
+                    self.T_film_marched = numpy.where(changed, self.T_film,
+                                                      self.T_film_marched)
+            film_exists, rT_layers, T_films = self.film_profile
+
+            # designs without film cooling always show the current temp.
+            T_films = numpy.where(self.has_film[:, None], T_films,
+                                  self.T_film[:, None])
+        else:
+            film_exists = numpy.zeros(self.T.shape, dtype=bool)
+            rT_layers = numpy.ones(self.T.shape)
+            T_films = numpy.repeat(self.T_film[:, None], self.T.shape[1], 1)
+
+        self.h_g = self.get_h_g(self.T)
+        self.T_films = T_films
+        self.rT_layers = rT_layers
+        self.film_exists = film_exists
+
+    def heat_film_mixing(self):
+        """transient_solver.heat_film_mixing() for all designs at once."""
+        T_gas = self.T_gas
+        T_mixing = get_film_mixing_temps(self.T_films, self.is_filmInject,
+                                         self.get_T_clt_in())
+
+        T_effective = numpy.minimum(T_mixing + self.rT_layers *
+                                    (T_gas - T_mixing), T_gas)
+
+        self.T_effective = T_effective
+        self.Q_in_per_area = numpy.where(
+            self.film_exists, 0,
+            self.h_g * (T_effective - (self.T + self.T_diff / 2)))
+
+    def cool(self, time_step, marched=None):
+        """transient_solver.cool() for all designs at once.
+
+        If marched is given, only the results of those designs are updated
+        and the others keep the results of their last march.
+
+        :param time_step:
+        :param marched: bool per design (Default value = None)
+
+        """
+        (Q_out, T_clt, P_clt, Reynolds, clt_vel, press_drop,
+         T_film) = march_coolant_ensemble_kernel(
+             self.T - self.T_diff / 2,
+             self.mdot_clts,
+             self.h_l,
+             self.A_clt,
+             self.flow_area,
+             self.D_hydro,
+             self.h,
+             self.is_filmInject,
+             self.T_clt,
+             self.P_clt,
+             self.T_film,
+             time_step,
+             self.n_cochan,
+             self.cooled,
+             self.mtl_clt.get_density,
+             self.mtl_clt.get_viscosity,
+             self.mtl_clt.get_specific_heat,
+         )
+
+        # compute Nusselt number (Dittus Boelter), the Reynolds numbers of
+        # designs without coolant flow may be undefined
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            Nusselt = numpy.where(
+                self.cooled[:, None],
+                0.023 * Reynolds**0.8 * self.Pr_clt[:, None]**0.3, 0)
+
+        results = [T_clt, P_clt, Reynolds, Nusselt, clt_vel, press_drop]
+        if marched is None:
+            for name, result in zip(coolant_results, results):
+                setattr(self, name, result)
+            self.T_film = T_film
+            self.T_wall_cooled = self.T.copy()
+            self.n_steps_uncooled[:] = 0
+        else:
+            for name, result in zip(coolant_results, results):
+                setattr(self, name,
+                        numpy.where(marched[:, None], result,
+                                    getattr(self, name)))
+            self.T_film = numpy.where(marched, T_film, self.T_film)
+            self.T_wall_cooled = numpy.where(marched[:, None], self.T,
+                                             self.T_wall_cooled)
+            self.n_steps_uncooled[marched] = 0
+
+        return Q_out
+
+    def needs_coolant_march(self):
+        """transient_solver.needs_coolant_march() for every design, as a bool
+        array."""
+        if self.T_wall_cooled is None:
+            return numpy.ones(len(self), dtype=bool)
+        needs = self.n_steps_uncooled >= self.coolant_interval - 1
+        if self.coolant_tol is not None:
+            dT_wall = numpy.max(numpy.abs(self.T - self.T_wall_cooled), 1)
+            needs |= dT_wall > self.coolant_tol
+        return needs
+
+    def cool_quasi_steady(self, time_step):
+        """See transient_solver.cool_quasi_steady().
+
+        :param time_step:
+
+        """
+        T_cold = self.T - self.T_diff / 2
+        self.n_steps_uncooled += 1
+        return self.h_l * (T_cold - self.get_T_clt_in()) * self.A_clt * time_step
+
+    def get_T_clt_in(self):
+        """See transient_solver.get_T_clt_in()."""
+        return numpy.append(self.T_clt_stations[:, 1:], self.T_clt[:, None], 1)
+
+    def update_wall_implicit(self, time_step, h_gA, T_effective, h_lA,
+                             T_clt_in):
+        """transient_solver.update_wall_implicit() for all designs at once.
+
+        :param time_step:
+        :param h_gA:
+        :param T_effective:
+        :param h_lA:
+        :param T_clt_in:
+
+        """
+        if self.integrator == "cn":
+            theta = 0.5
+        else:
+            theta = 1
+
+        i_up = self.i_up
+        i_dn = self.i_dn
+
+        T_old = self.T.copy()
+        C = self.get_heat_capacity()
+        G = self.get_axial_conductances()
+
+        a = h_gA + h_lA
+        b = (h_gA * (T_effective - self.T_diff / 2) + h_lA *
+             (T_clt_in + self.T_diff / 2))
+        G_sum = self.get_interface_sums(G, G)
+
+        Q_axial_old = G * (T_old[:, i_dn] - T_old[:, i_up])
+        F_old = (-a * T_old + b +
+                 self.get_interface_sums(Q_axial_old, -Q_axial_old))
+
+        C_per_step = C / time_step
+        diag = C_per_step + theta * (a + G_sum)
+        off_diag = -theta * G
+        rhs = C_per_step * T_old + theta * b + (1 - theta) * F_old
+        self.T = solve_tridiagonal_stack(off_diag, diag, off_diag, rhs)
+
+        T_avg = theta * self.T + (1 - theta) * T_old
+        Q_in = h_gA * (T_effective - (T_avg + self.T_diff / 2)) * time_step
+        Q_out = h_lA * ((T_avg - self.T_diff / 2) - T_clt_in) * time_step
+
+        return Q_in, Q_out
+
+    def step(self, time_step):
+        """Advances the walls of all designs by one time step.
+
+        :param time_step:
+
+        """
+        self.heat_gas_side()
+
+        # the coolant is marched for all designs at once, but only the
+        # designs that need a new march take its results
+        needs_march = self.needs_coolant_march()
+        if needs_march.all():
+            Q_out = self.cool(time_step)
+        else:
+            Q_out = self.cool_quasi_steady(time_step)
+            if needs_march.any():
+                Q_out = numpy.where(needs_march[:, None],
+                                    self.cool(time_step, needs_march), Q_out)
+        self.heat_film_mixing()
+        Q_in = self.Q_in_per_area * self.A_chm * time_step
+
+        if self.integrator == "explicit":
+            Q_net = Q_in - Q_out
+            self.T += Q_net / self.get_heat_capacity()
+            self.conduct_axial(time_step)
+
+        else:
+            h_gA = numpy.where(self.film_exists, 0, self.h_g * self.A_chm)
+            Q_in, Q_out = self.update_wall_implicit(time_step, h_gA,
+                                                    self.T_effective,
+                                                    self.h_l * self.A_clt,
+                                                    self.get_T_clt_in())
+            self.Q_in_per_area = Q_in / (self.A_chm * time_step)
+            Q_net = Q_in - Q_out
+
+        self.T_diff = numpy.where(
+            self.cooled[:, None],
+            Q_net * self.get_thermal_resistance() / time_step, self.T_diff)
+
+        self.Q_in = Q_in
+        self.Q_out = Q_out
+        self.time_step = time_step
+
+    def split(self):
+        """Hands the wall temps. and the results of the last step of every
+        design back to its transient_solver."""
+        for k, solver in enumerate(self.solvers):
+            solver.segs.T = self.T[k].copy()
+            solver.segs.T_diff = self.T_diff[k].copy()
+            solver.T_film = float(self.T_film[k])
+            for name in step_results:
+                setattr(solver, name, getattr(self, name)[k].copy())
+            solver.time_step = self.time_step
@@ -31,15 +31,23 @@ def get_convection_coeff(D_star, vis, Cp, Pr, Pc, c_star, r_c, A_star, A, gamma,
     # gives:
     # h_g = convection coefficient in W m-2 K-1
 
+    h_g = get_convection_coeff_factor(D_star, vis, Cp, Pr, Pc, c_star, r_c, A_star, A) * get_sigma(gamma, M, Tw, T0)
+
+    return h_g
+
+# the Bartz equation without sigma, i.e. the part that doesn't depend on the
+# wall temperature (same inputs and units as get_convection_coeff)
+def get_convection_coeff_factor(D_star, vis, Cp, Pr, Pc, c_star, r_c, A_star, A):
+
     vis = vis * 0.0001 # convert millipoise to Pa.s
     Cp = Cp * 1000 # convert kJ kg-1 K-1 to J kg-1 K-1
 
-    # sigma = correction factor for boundary layer
-    sigma = 1 / ((0.5 * (Tw/T0) * (1 + (gamma-1)/2 * M**2) + 0.5)**(0.68)) * ((1 + (gamma-1)/2 * M**2)**(0.12))
+    return (0.026 / D_star**0.2) * (vis**0.2 * Cp)/Pr**0.6 * (Pc/c_star)**0.8 * (D_star/r_c)**0.1 * (A_star/A)**0.9
 
-    h_g = (0.026 / D_star**0.2) * (vis**0.2 * Cp)/Pr**0.6 * (Pc/c_star)**0.8 * (D_star/r_c)**0.1 * (A_star/A)**0.9 * sigma
-    
-    return h_g
+# sigma = correction factor for boundary layer
+def get_sigma(gamma, M, Tw, T0):
+
+    return 1 / ((0.5 * (Tw/T0) * (1 + (gamma-1)/2 * M**2) + 0.5)**(0.68)) * ((1 + (gamma-1)/2 * M**2)**(0.12))
 
 # Lebedinsky E.V., Kalmykov G.P., et al. Working processes in liquid-propellant rocket
 # engine and their simulation. Moscow, Mashinostroenie, 2008
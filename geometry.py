@@ -1,5 +1,7 @@
 import math
 
+import numpy
+
 from bell_nozzle import *
 from material import CuCrZr
 from material import SS304L
@@ -140,6 +142,265 @@ class cylinder:
                                  self.A_chm)
 
 
+# wall_segments holds every axial station of the engine wall in NumPy arrays
+# (one entry per station, ordered from injector face to nozzle exit) so that the
+# time loop can update all of them at once instead of walking a list of
+# cylinder objects and calling their getters one by one.
+
+
+class wall_segments:
+    """ """
+
+    def __init__(self, x, r_in, r_out, h, n_clt, r_clt, a_clt, b_clt, mtl,
+                 T_init, M):
+        self.x = numpy.array(x, dtype=float)
+        self.r_in = numpy.array(r_in, dtype=float)
+        self.r_out = numpy.array(r_out, dtype=float)
+        self.thickness = self.r_out - self.r_in
+        self.h = numpy.full(self.x.shape, h, dtype=float)  # heights
+
+        self.n_clt = n_clt  # number of coolant channels
+        self.r_clt = numpy.array(r_clt, dtype=float)
+        self.a_clt = a_clt  # coolant channel tangential width
+        self.b_clt = b_clt  # coolant channel radial depth
+
+        self.mtl = mtl  # material
+        self.T = numpy.full(self.x.shape, T_init,
+                            dtype=float)  # temperatures
+        self.T_diff = numpy.zeros(self.x.shape)  # inner - outer wall temp.
+        self.Mach = numpy.array(M, dtype=float)
+
+        self.A_chm = get_sector_face_area(self.r_in, 360, self.h)
+        self.A_cochan_flow = numpy.full(self.x.shape, a_clt * b_clt)
+        self.A_clt = n_clt * self.h * (a_clt + 2 * b_clt)
+        # wall cross-section conducting heat along the engine axis (m2)
+        self.A_axial = get_area_of_sector(self.r_in, self.r_out,
+                                          360) - (self.A_cochan_flow * n_clt)
+
+        self.V = get_volume_of_sector(self.r_in, self.r_out, 360, self.h) - (
+            self.A_cochan_flow * self.h * n_clt)
+        self.m = self.V * self.mtl.get_density()
+
+        # interfaces between neighbouring stations, station i_up[f] is the
+        # upstream (injector side) neighbour of station i_dn[f]
+        self.i_up = numpy.arange(0, len(self.x) - 1)
+        self.i_dn = numpy.arange(1, len(self.x))
+        # distance between the centres of neighbouring stations, the stations
+        # don't all have the same height on a graded mesh
+        self.dx_axial = (self.h[self.i_up] + self.h[self.i_dn]) / 2
+
+    def __len__(self):
+        return len(self.x)
+
+    def get_m(self):
+        """ """
+        return self.m
+
+    def get_Mach(self):
+        """ """
+        return self.Mach
+
+    def get_mtl(self):
+        """ """
+        return self.mtl
+
+    def get_T(self):
+        """ """
+        return self.T
+
+    def get_A_chm(self):
+        """ """
+        return self.A_chm
+
+    def get_A_clt(self):
+        """ """
+        return self.A_clt
+
+    def get_A_cochan_flow(self):
+        """ """
+        return self.A_cochan_flow
+
+    def get_spec_heat(self):
+        """ """
+        return self.mtl.get_specific_heat(self.T)
+
+    def get_heat_capacity(self):
+        """ """
+        return self.get_spec_heat() * self.m
+
+    def get_thermal_resistance(self):
+        """ """
+        return self.thickness / (self.mtl.get_thermal_conductivity(self.T) *
+                                 self.A_chm)
+
+    def get_chan_widths(self):
+        """ """
+        return (2 * pi * self.r_clt) * (self.a_clt / 360)
+
+    def get_index_at(self, x):
+        """Returns the index of the station closest to position x.
+
+        :param x:
+
+        """
+        return int(numpy.argmin(numpy.abs(self.x - x)))
+
+
+# radial_wall splits the wall of every station of a wall_segments into radial
+# nodes, so that the temperature drop across the wall is resolved instead of
+# being estimated from the heat flow. the nodes are (from the gas side out)
+# n_nodes - 2 layers across the inner liner up to the channel bottoms, the
+# rib layer between the coolant channels and the outer shell that closes the
+# channels. every node sits in the middle of its layer.
+
+
+class radial_wall:
+    """Radial nodes of the wall of every station of a wall_segments: layers
+    of the liner between the gas and the channel bottoms, the ribs between
+    the channels and the outer shell closing them."""
+
+    def __init__(self, segs, n_nodes, mtl_shell, shell_thickness):
+        """
+
+        :param segs: wall_segments
+        :param n_nodes: number of radial nodes (at least 3)
+        :param mtl_shell: outer shell material
+        :param shell_thickness:
+
+        """
+        n_liner = n_nodes - 2
+        self.i_bottom = n_liner - 1  # liner node at the channel bottoms
+        self.i_rib = n_liner
+        self.i_shell = n_liner + 1
+
+        # radii of the layer boundaries (station x node + 1)
+        r_bounds = [
+            segs.r_in + (segs.r_clt - segs.r_in) * j / n_liner
+            for j in range(n_liner + 1)
+        ]
+        r_bounds += [segs.r_out, segs.r_out + shell_thickness]
+        self.r_bounds = numpy.column_stack(r_bounds)
+        r_lo = self.r_bounds[:, :-1]
+        r_hi = self.r_bounds[:, 1:]
+        r_mid = (r_lo + r_hi) / 2
+
+        self.mtls = [segs.mtl] * (n_liner + 1) + [mtl_shell]
+
+        # the coolant channels take up part of the rib layer
+        ring = pi * (r_hi**2 - r_lo**2)
+        A_rib = ring[:, self.i_rib] - segs.A_cochan_flow * segs.n_clt
+        if numpy.any(A_rib <= 0):
+            raise ValueError("The coolant channels leave no ribs between them")
+        self.fraction = numpy.ones(ring.shape)  # solid part of every layer
+        self.fraction[:, self.i_rib] = A_rib / ring[:, self.i_rib]
+
+        h = segs.h[:, None]
+        self.A_axial = ring * self.fraction
+        self.m = self.A_axial * h * numpy.array(
+            [mtl.get_density() for mtl in self.mtls])
+
+        # conduction lengths over areas (m-1) from a node to the inner and
+        # the outer boundary of its layer, divided by the conductivity these
+        # become thermal resistances
+        self.S_in = numpy.log(r_mid / r_lo) / (2 * pi * h * self.fraction)
+        self.S_out = numpy.log(r_hi / r_mid) / (2 * pi * h * self.fraction)
+
+        # the coolant wets the channel bottoms (liner) and sides (ribs), the
+        # ribs conduct to their sides from their middle
+        self.A_bottom = segs.n_clt * segs.a_clt * segs.h
+        self.A_side = 2 * segs.n_clt * segs.b_clt * segs.h
+        rib_widths = (2 * pi * r_mid[:, self.i_rib] / segs.n_clt - segs.a_clt)
+        self.S_side = (rib_widths / 2) / self.A_side
+
+        self.T = numpy.repeat(segs.T[:, None], n_nodes, 1)  # temperatures
+
+    def get_m(self):
+        """Returns the mass of every station."""
+        return self.m.sum(1)
+
+    def get_node_property(self, name):
+        """Returns a temperature dependent material property (e.g.
+        "get_thermal_conductivity") of every node.
+
+        :param name:
+
+        """
+        values = numpy.empty(self.T.shape)
+        for k, mtl in enumerate(self.mtls):
+            values[:, k] = getattr(mtl, name)(self.T[:, k])
+        return values
+
+    def get_heat_capacities(self):
+        """ """
+        return self.get_node_property("get_specific_heat") * self.m
+
+    def update_conductances(self, h_gA, h_l, dx_axial, i_dn):
+        """Computes the conductances (W K-1) of the wall for the current node
+        temps. and stores them in G_gas (gas to the first node), G_bottom and
+        G_side (coolant to the liner and the rib node), G_radial (node k to
+        k + 1) and G_axial (station interfaces, every node), and the
+        resistances between the nodes and the wetted surfaces.
+
+        :param h_gA: gas-side conductance per station (W K-1)
+        :param h_l: coolant heat transfer coefficient per station
+        :param dx_axial: distance between the station centres
+        :param i_dn: downstream station of every interface
+
+        """
+        k = self.get_node_property("get_thermal_conductivity")
+
+        self.R_gas = self.S_in[:, 0] / k[:, 0]
+        self.R_bottom = self.S_out[:, self.i_bottom] / k[:, self.i_bottom]
+        self.R_side = self.S_side / k[:, self.i_rib]
+
+        # surface conductances in series with the conduction to the node
+        h_lA_bottom = h_l * self.A_bottom
+        h_lA_side = h_l * self.A_side
+        self.G_gas = h_gA / (1 + h_gA * self.R_gas)
+        self.G_bottom = h_lA_bottom / (1 + h_lA_bottom * self.R_bottom)
+        self.G_side = h_lA_side / (1 + h_lA_side * self.R_side)
+
+        self.G_radial = 1 / (self.S_out[:, :-1] / k[:, :-1] +
+                             self.S_in[:, 1:] / k[:, 1:])
+        self.G_axial = k[i_dn] * self.A_axial[i_dn] / dx_axial[:, None]
+
+    def get_surface_temps(self, T_effective, T_clt_in):
+        """Returns the gas-side surface temps. and the coolant-side surface
+        temps. (averaged over the wetted area) of every station, using the
+        conductances of the last update_conductances().
+
+        :param T_effective:
+        :param T_clt_in: coolant temp. entering each station
+
+        """
+        T_liner = self.T[:, 0]
+        T_hot = T_liner + self.G_gas * (T_effective - T_liner) * self.R_gas
+
+        T_bottom = self.T[:, self.i_bottom]
+        T_bottom = T_bottom - self.G_bottom * (T_bottom -
+                                               T_clt_in) * self.R_bottom
+        T_side = self.T[:, self.i_rib]
+        T_side = T_side - self.G_side * (T_side - T_clt_in) * self.R_side
+        T_cold = ((self.A_bottom * T_bottom + self.A_side * T_side) /
+                  (self.A_bottom + self.A_side))
+
+        return T_hot, T_cold
+
+    def set_profile(self, T_hot, T_cold):
+        """Sets the node temps. to a linear drop across the liner from the
+        gas-side to the coolant-side temps., with the ribs and the outer
+        shell at the coolant-side temps.
+
+        :param T_hot:
+        :param T_cold:
+
+        """
+        n_liner = self.i_rib
+        for j in range(n_liner):
+            self.T[:, j] = T_hot + (T_cold - T_hot) * (j + 0.5) / n_liner
+        self.T[:, self.i_rib:] = T_cold[:, None]
+
+
 # calculate_geometry() calculates the whole geometry all at once and show it
 # to the user so that they can see if there are any problems with the mathematical model.
 # also it generates a list that can be used as a look-up table for radius at various
@@ -190,8 +451,8 @@ def calculate_geometry(
         """
 
         if theta > 2 * pi:
-            print("Func: arc_diff() -- Make sure theta is in radians!")
-            quit()
+            raise ValueError(
+                "Func: arc_diff() -- Make sure theta is in radians!")
 
         # takes R in meters, theta in radians
         # returns radius difference in meters
@@ -241,10 +502,9 @@ def calculate_geometry(
     L_chm_cylinder = L_engine - (L_chm_contract_total + L_nzl)
 
     if L_chm_cylinder <= 0:
-        print(
+        raise ValueError(
             "Invalid geometry! No room for cylindrical combustion chamber segment!"
         )
-        quit()
 
     # show calculated engine geometry
     L1 = 0
@@ -385,8 +645,8 @@ def calculate_geometry_bell(
         """
 
         if theta > 2 * pi:
-            print("Func: arc_diff() -- Make sure theta is in radians!")
-            quit()
+            raise ValueError(
+                "Func: arc_diff() -- Make sure theta is in radians!")
 
         # takes R in meters, theta in radians
         # returns radius difference in meters
@@ -582,8 +842,8 @@ def get_inner_radius_at(
         """
 
         if theta > 2 * pi:
-            print("Func: arc_diff() -- Make sure theta is in radians!")
-            quit()
+            raise ValueError(
+                "Func: arc_diff() -- Make sure theta is in radians!")
 
         # takes R in meters, theta in radians
         # returns radius difference in meters
@@ -632,10 +892,9 @@ def get_inner_radius_at(
     L_chm_cylinder = L_engine - (L_chm_contract_total + L_nzl)
 
     if L_chm_cylinder <= 0:
-        print(
+        raise ValueError(
             "Invalid geometry! No room for cylindrical combustion chamber segment!"
         )
-        quit()
 
     # show calculated engine geometry
     L1 = 0  # injector mount
@@ -682,8 +941,7 @@ def get_inner_radius_at(
             R_exit - R_nzl_downstream_curve_max) * ((i - L6) / L_nzl_cone)
 
     else:
-        print("ERROR:", x, "is out of bounds to get radius!")
-        quit()
+        raise ValueError(str(x) + " is out of bounds to get radius!")
 
     return y_current  # meters
 
@@ -725,8 +983,8 @@ def get_inner_radius_at_bell(
         """
 
         if theta > 2 * pi:
-            print("Func: arc_diff() -- Make sure theta is in radians!")
-            quit()
+            raise ValueError(
+                "Func: arc_diff() -- Make sure theta is in radians!")
 
         # takes R in meters, theta in radians
         # returns radius difference in meters
@@ -811,6 +1069,93 @@ def get_inner_radius_at_bell(
     return y_current
 
 
+# get_graded_stations() places the analysis stations closer together around the
+# throat, where the heat flux peaks, and further apart along the chamber barrel
+# and the nozzle skirt. the station density follows a bell curve around the
+# throat that is one throat diameter wide, on top of a uniform density.
+
+
+def get_graded_stations(L_engine, n_stations, x_thrt, D_thrt, grading):
+    """Returns the positions (upstream ends) and heights of the stations of
+    a mesh that is refined around the throat.
+
+    :param L_engine:
+    :param n_stations:
+    :param x_thrt: throat position
+    :param D_thrt:
+    :param grading: ratio of the largest to the smallest station height
+
+    """
+    x_fine = numpy.linspace(0, L_engine, 100 * n_stations + 1)
+    density = 1 + (grading - 1) * numpy.exp(-((x_fine - x_thrt) / D_thrt)**2)
+
+    # every station gets the same share of the integrated density
+    cumulative = numpy.concatenate(
+        ([0], numpy.cumsum((density[1:] + density[:-1]) / 2 *
+                           numpy.diff(x_fine))))
+    edges = numpy.interp(numpy.linspace(0, cumulative[-1], n_stations + 1),
+                         cumulative, x_fine)
+
+    return edges[:-1].tolist(), numpy.diff(edges)
+
+
+# get_refined_stations() adapts a mesh to a solution: stations where the heat
+# flux or the wall temp. changes by more than tol (relative) towards a
+# neighbour are split in half, and so are the stations around the heat flux
+# peak. neighbouring stations of the same height where both change by less
+# than a quarter of tol are merged again.
+
+
+def get_refined_stations(xs, hs, q, T, tol, h_min, h_max):
+    """Returns the positions and heights of the stations of the adapted mesh.
+
+    :param xs: station positions (upstream ends)
+    :param hs: station heights
+    :param q: heat flux at every station
+    :param T: wall temp. at every station
+    :param tol: relative change between neighbours above which a station is split
+    :param h_min: min. station height
+    :param h_max: max. station height
+
+    """
+    q = numpy.asarray(q, dtype=float)
+    T = numpy.asarray(T, dtype=float)
+    jumps = numpy.maximum(
+        numpy.abs(numpy.diff(q)) / max(numpy.abs(q).max(), 1e-30),
+        numpy.abs(numpy.diff(T)) / max(T.max() - T.min(), 1e-30),
+    )
+
+    # every station is judged by the larger change towards its neighbours
+    changes = numpy.zeros(len(xs))
+    changes[:-1] = jumps
+    changes[1:] = numpy.maximum(changes[1:], jumps)
+
+    # the heat flux is flat at its peak, but that is where it matters most
+    i_peak = int(numpy.argmax(q))
+    changes[max(i_peak - 1, 0):i_peak + 2] = math.inf
+
+    new_xs = []
+    new_hs = []
+    i = 0
+    while i < len(xs):
+        if changes[i] > tol and hs[i] / 2 >= h_min * (1 - 1e-9):
+            new_xs += [xs[i], xs[i] + hs[i] / 2]
+            new_hs += [hs[i] / 2, hs[i] / 2]
+            i += 1
+        elif (i + 1 < len(xs) and max(changes[i], changes[i + 1]) < tol / 4
+              and math.isclose(hs[i], hs[i + 1])
+              and hs[i] * 2 <= h_max * (1 + 1e-9)):
+            new_xs.append(xs[i])
+            new_hs.append(hs[i] + hs[i + 1])
+            i += 2
+        else:
+            new_xs.append(xs[i])
+            new_hs.append(hs[i])
+            i += 1
+
+    return new_xs, numpy.array(new_hs)
+
+
 # this one below isn't any rocket science
 
 
@@ -0,0 +1,315 @@
+# - - - - - - - - - - - - - - - - - - - -
+# TIME STEP KERNELS
+# - - - - - - - - - - - - - - - - - - - -
+# Station marches that cannot be written
+# as array operations, in plain scalar
+# code so that they can be JIT-compiled
+# with numba when it is installed.
+# - - - - - - - - - - - - - - - - - - - -
+import warnings
+
+import numpy
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+kernel_backends = ["python", "numba"]
+
+
+def march_coolant_kernel(
+    T_colds,
+    mdot_clts,
+    h_ls,
+    A_clts,
+    flow_areas,
+    D_hydros,
+    hs,
+    is_filmInject,
+    T_clt,
+    P_clt,
+    T_film,
+    time_step,
+    n_cochan,
+    cooled,
+    get_density,
+    get_viscosity,
+    get_specific_heat,
+    Q_outs,
+    T_clts,
+    P_clts,
+    Reynolds,
+    clt_vels,
+    press_drops,
+):
+    """Loops backwards from the nozzle exit manifold to the injector face
+    to compute the heat absorbed by the regen cooling channels.
+
+    The station inputs can be lists or arrays. The results are written into
+    Q_outs, T_clts, P_clts, Reynolds, clt_vels and press_drops, and the
+    film cooling injection temp. is returned.
+
+    :param T_colds: cold side wall temps.
+    :param mdot_clts: coolant mass flow per channel
+    :param h_ls: coolant heat transfer coefficients
+    :param A_clts: cooled wall areas
+    :param flow_areas: channel flow areas
+    :param D_hydros: channel hydraulic diameters
+    :param hs: station lengths
+    :param is_filmInject: whether a film cooling injector is fed at a station
+    :param T_clt: manifold coolant temp.
+    :param P_clt: manifold coolant press.
+    :param T_film: film cooling injection temp. if no injector is fed
+    :param time_step:
+    :param n_cochan:
+    :param cooled: False if there is no coolant flow
+    :param get_density: coolant density function of temp.
+    :param get_viscosity: coolant viscosity function of temp.
+    :param get_specific_heat: coolant specific heat function of temp.
+    :param Q_outs:
+    :param T_clts:
+    :param P_clts:
+    :param Reynolds:
+    :param clt_vels:
+    :param press_drops:
+
+    """
+    T_clt_current = T_clt  # revert to manifold temperature
+    P_clt_current = P_clt  # revert to manifold pressure
+    T_film_inject = T_film
+
+    for i in range(len(T_colds) - 1, -1, -1):
+
+        # get film cooling injection point temperature
+        if is_filmInject[i]:
+            T_film_inject = T_clt_current
+
+        mdot_clt_current = mdot_clts[i]
+        D_hydro = D_hydros[i]
+        flow_area = flow_areas[i]
+
+        # compute Reynold's number
+        Reynolds_num = (mdot_clt_current * D_hydro) / (
+            get_viscosity(T_clt_current) * flow_area)
+        Reynolds[i] = Reynolds_num
+
+        if cooled:
+            Q_out = (h_ls[i] * (T_colds[i] - T_clt_current) * A_clts[i] *
+                     time_step)
+            Q_outs[i] = Q_out
+
+            # increase coolant fluid temp.
+            clt_vel = mdot_clt_current / (get_density(T_clt_current) *
+                                          flow_area)
+            dT_clt = (Q_out / (n_cochan * time_step)) / (
+                mdot_clt_current * get_specific_heat(T_clt_current))
+            T_clt_current += dT_clt
+            clt_vels[i] = clt_vel
+
+            # compute coolant pressure drop and update pressures
+            epsilon_f = 1
+
+            if Reynolds_num <= 2320:
+                friction_loss_coeff = (64 / Reynolds_num) * epsilon_f
+            elif Reynolds_num < 10e5:
+                friction_loss_coeff = (0.3164 /
+                                       (Reynolds_num**(1 / 4))) * epsilon_f
+            else:
+                friction_loss_coeff = (0.0032 + (0.221 /
+                                                 (Reynolds_num**
+                                                  (0.237)))) * epsilon_f
+
+            coolant_press_drop = (friction_loss_coeff * (hs[i] / D_hydro) *
+                                  get_density(T_clt_current) *
+                                  ((clt_vel**2) / 2))
+            P_clt_current -= coolant_press_drop
+            press_drops[i] = coolant_press_drop
+
+        T_clts[i] = T_clt_current
+        P_clts[i] = P_clt_current
+
+    return T_film_inject
+
+
+def march_coolant_ensemble_kernel(
+    T_colds,
+    mdot_clts,
+    h_ls,
+    A_clts,
+    flow_areas,
+    D_hydros,
+    hs,
+    is_filmInject,
+    T_clt,
+    P_clt,
+    T_film,
+    time_step,
+    n_cochan,
+    cooled,
+    get_density,
+    get_viscosity,
+    get_specific_heat,
+):
+    """march_coolant_kernel() for several designs at once. The station inputs
+    are (design x station) arrays and T_clt, P_clt, T_film, n_cochan and
+    cooled have one value per design. The property functions must take
+    arrays of temperatures.
+
+    Only the coolant temps. depend on the station before, so only they are
+    marched (for all designs at once). Everything else is computed from them
+    afterwards for all stations at once.
+
+    Returns the (design x station) arrays Q_outs, T_clts, P_clts, Reynolds,
+    clt_vels and press_drops, and the film cooling injection temps.
+
+    """
+    n_designs, n = T_colds.shape
+    Q_outs = numpy.empty((n_designs, n))
+    T_clts = numpy.empty((n_designs, n))
+    T_clt_ins = numpy.empty((n_designs, n))  # coolant temp. entering
+
+    # designs without coolant flow keep the manifold temp. and press.
+    Q_coeffs = numpy.where(cooled[:, None], h_ls * A_clts * time_step, 0)
+    dT_coeffs = numpy.where(cooled[:, None],
+                            n_cochan[:, None] * time_step * mdot_clts, 1)
+
+    T_clt_current = numpy.array(T_clt, dtype=float)
+    for i in range(n - 1, -1, -1):
+        T_clt_ins[:, i] = T_clt_current
+        Q_out = Q_coeffs[:, i] * (T_colds[:, i] - T_clt_current)
+        T_clt_current = T_clt_current + Q_out / (
+            dT_coeffs[:, i] * get_specific_heat(T_clt_current))
+        Q_outs[:, i] = Q_out
+        T_clts[:, i] = T_clt_current
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        # compute Reynold's number
+        Reynolds = (mdot_clts * D_hydros) / (get_viscosity(T_clt_ins) *
+                                             flow_areas)
+
+        clt_vels = mdot_clts / (get_density(T_clt_ins) * flow_areas)
+
+        # compute coolant pressure drop and update pressures
+        friction_loss_coeff = numpy.where(
+            Reynolds <= 2320,
+            64 / Reynolds,
+            numpy.where(Reynolds < 10e5, 0.3164 / (Reynolds**(1 / 4)),
+                        0.0032 + (0.221 / (Reynolds**(0.237)))),
+        )
+        press_drops = (friction_loss_coeff * (hs / D_hydros) *
+                       get_density(T_clts) * ((clt_vels**2) / 2))
+
+    clt_vels = numpy.where(cooled[:, None], clt_vels, 0)
+    press_drops = numpy.where(cooled[:, None], press_drops, 0)
+    P_clts = P_clt[:, None] - numpy.cumsum(press_drops[:, ::-1], 1)[:, ::-1]
+
+    # the film cooling injection temp. is that of the coolant entering the
+    # injector station closest to the injector face
+    T_film_inject = numpy.array(T_film, dtype=float)
+    fed = is_filmInject.any(1)
+    i_first = numpy.argmax(is_filmInject, 1)
+    T_film_inject[fed] = T_clt_ins[fed, i_first[fed]]
+
+    return Q_outs, T_clts, P_clts, Reynolds, clt_vels, press_drops, T_film_inject
+
+
+def solve_banded_kernel(bands, rhs, w, x):
+    """Solves a banded linear system by Gaussian elimination. There is no
+    pivoting, the system must be diagonally dominant (as heat balances are).
+
+    bands[i][w + j - i] is the coefficient of unknown j in equation i, for
+    the w unknowns on either side of i. bands and rhs can be lists or arrays,
+    they are overwritten. The solution is written into x.
+
+    :param bands:
+    :param rhs:
+    :param w: half bandwidth
+    :param x:
+
+    """
+    n = len(rhs)
+
+    for k in range(n):
+        row_k = bands[k]
+        pivot = row_k[w]
+        for i in range(k + 1, min(k + w + 1, n)):
+            row_i = bands[i]
+            factor = row_i[w + k - i] / pivot
+            if factor != 0:
+                for j in range(k + 1, min(k + w + 1, n)):
+                    row_i[w + j - i] -= factor * row_k[w + j - k]
+                rhs[i] -= factor * rhs[k]
+
+    for k in range(n - 1, -1, -1):
+        row_k = bands[k]
+        total = rhs[k]
+        for j in range(k + 1, min(k + w + 1, n)):
+            total -= row_k[w + j - k] * x[j]
+        x[k] = total / row_k[w]
+
+
+# compiled kernels, created on first use (compiling takes a few seconds)
+compiled_kernels = {}
+
+
+def get_compiled(function):
+    """Returns the numba compiled version of a function.
+
+    :param function:
+
+    """
+    if function not in compiled_kernels:
+        compiled_kernels[function] = numba.njit(function)
+    return compiled_kernels[function]
+
+
+def get_kernel_backend(backend, mtl_clt):
+    """Returns the backend the kernels can actually run with. The numba
+    backend needs numba to be installed and a coolant that provides its
+    properties as plain functions (get_kernel_properties()), otherwise the
+    python backend is used.
+
+    :param backend: one of kernel_backends
+    :param mtl_clt:
+
+    """
+    if backend == "numba":
+        if numba is None:
+            warnings.warn("numba is not installed, using the python kernels")
+            return "python"
+        if mtl_clt.get_kernel_properties() is None:
+            warnings.warn(mtl_clt.get_name() + " has no kernel properties, "
+                          "using the python kernels")
+            return "python"
+
+    return backend
+
+
+def get_march_coolant(backend, mtl_clt):
+    """Returns the coolant march kernel of a backend and the coolant
+    property functions to call it with.
+
+    :param backend: one of kernel_backends, as returned by get_kernel_backend()
+    :param mtl_clt:
+
+    """
+    if backend == "numba":
+        props = [get_compiled(f) for f in mtl_clt.get_kernel_properties()]
+        return get_compiled(march_coolant_kernel), props
+
+    props = [
+        mtl_clt.get_density, mtl_clt.get_viscosity, mtl_clt.get_specific_heat
+    ]
+    return march_coolant_kernel, props
+
+
+def get_solve_banded(backend):
+    """Returns the banded solver kernel of a backend.
+
+    :param backend: one of kernel_backends, as returned by get_kernel_backend()
+
+    """
+    if backend == "numba":
+        return get_compiled(solve_banded_kernel)
+    return solve_banded_kernel
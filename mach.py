@@ -33,6 +33,7 @@ def calc_mach_num(
     a_nzlExp,
     ROC_thrtDn,
     ROC_thrtUp,
+    interactive=True,
 ):
     """
 
@@ -51,6 +52,7 @@ def calc_mach_num(
     :param a_nzlExp:
     :param ROC_thrtDn:
     :param ROC_thrtUp:
+    :param interactive: ask before giving up on a Mach number (Default value = True)
 
     """
     global uni_gas_const, pi
@@ -203,6 +205,11 @@ def calc_mach_num(
 
             infinity_fuse += 1
 
+            if infinity_fuse > pseudo_infinity and not interactive:
+                raise RuntimeError(
+                    "Mach number calculator hasn't converged for " +
+                    str(pseudo_infinity) + " iterations.")
+
             if infinity_fuse > pseudo_infinity:
                 print(
                     "Mach number calculator might have entered an infinite loop, because it hasn't converged for",
@@ -218,9 +225,7 @@ def calc_mach_num(
                     macho = random.uniform(1.01, 4.99)
                     print("DEBUG: New initial guess:", macho)
                 elif fuse_replacement.lower() == "a":
-                    print("Analysis aborted.")
-                    input("Press Enter to quit...")
-                    quit()
+                    raise RuntimeError("Analysis aborted.")
                 else:
                     print("Invalid choice!")
 
@@ -246,6 +251,7 @@ def calc_mach_num_bell(
     length_percent,
     theta_n,
     theta_e,
+    interactive=True,
 ):
     """
 
@@ -264,6 +270,7 @@ def calc_mach_num_bell(
     :param length_percent:
     :param theta_n:
     :param theta_e:
+    :param interactive: ask before giving up on a Mach number (Default value = True)
 
     """
     global uni_gas_const, pi
@@ -324,6 +331,11 @@ def calc_mach_num_bell(
 
             infinity_fuse += 1
 
+            if infinity_fuse > pseudo_infinity and not interactive:
+                raise RuntimeError(
+                    "Mach number calculator hasn't converged for " +
+                    str(pseudo_infinity) + " iterations.")
+
             if infinity_fuse > pseudo_infinity:
                 print(
                     "Mach number calculator might have entered an infinite loop, because it hasn't converged for",
@@ -339,9 +351,7 @@ def calc_mach_num_bell(
                     macho = random.uniform(0.01, 0.99)
                     print("DEBUG: New initial guess:", macho)
                 elif fuse_replacement.lower() == "a":
-                    print("Analysis aborted.")
-                    input("Press Enter to quit...")
-                    quit()
+                    raise RuntimeError("Analysis aborted.")
                 else:
                     print("Invalid choice!")
 
@@ -408,6 +418,11 @@ def calc_mach_num_bell(
 
             infinity_fuse += 1
 
+            if infinity_fuse > pseudo_infinity and not interactive:
+                raise RuntimeError(
+                    "Mach number calculator hasn't converged for " +
+                    str(pseudo_infinity) + " iterations.")
+
             if infinity_fuse > pseudo_infinity:
                 print(
                     "Mach number calculator might have entered an infinite loop, because it hasn't converged for",
@@ -423,9 +438,7 @@ def calc_mach_num_bell(
                     macho = random.uniform(1.01, 4.99)
                     print("DEBUG: New initial guess:", macho)
                 elif fuse_replacement.lower() == "a":
-                    print("Analysis aborted.")
-                    input("Press Enter to quit...")
-                    quit()
+                    raise RuntimeError("Analysis aborted.")
                 else:
                     print("Invalid choice!")
 
@@ -1,7 +1,20 @@
 import math
 
+import numpy
+
+try:
+    from numba.extending import register_jitable
+except ImportError:
+    # without numba the kernels are plain python, which can call anything
+    def register_jitable(function):
+        return function
+
 class material:
-    pass
+    def get_kernel_properties(self):
+        # (density, viscosity, specific heat) as plain functions of
+        # temperature, for the JIT-compiled kernels (see kernels.py)
+        # None if the material does not provide them
+        return None
 
 # stainless steel 304L
 # References: Choong S. Kim - Thermophysical Properties of Stainless Steels
@@ -21,20 +34,18 @@ class SS304L(material):
     def get_thermal_conductivity(self, temp):
         # takes temperature in K
         # returns thermal conductivity in (W m-1 K-1)
-        if temp < 1673:
-            return (0.08116 + 0.0001618 * temp) * 100
-        else:
-            #print("304L melting!")
-            return (0.1229 + (3.279 * 10**(-5)) * temp) * 100
+        # (temp can also be an array of temperatures)
+        return numpy.where(temp < 1673,
+                           (0.08116 + 0.0001618 * temp) * 100,
+                           (0.1229 + (3.279 * 10**(-5)) * temp) * 100)
 
     def get_thermal_diffusivity(self, temp):
         # takes temperature in K
         # returns thermal diffusivity in (m2 s-1)
-        if temp < 1673:
-            return (0.02276 + 3.285*10**(-5) * temp + 2.762*10**(-9) * (temp**2)) / 10000
-        else:
-            #print("304L melting!")
-            return (0.02514 + 1.996*10**(-7) * temp + 2.386*10**(-9) * (temp**2)) / 10000
+        # (temp can also be an array of temperatures)
+        return numpy.where(temp < 1673,
+                           (0.02276 + 3.285*10**(-5) * temp + 2.762*10**(-9) * (temp**2)) / 10000,
+                           (0.02514 + 1.996*10**(-7) * temp + 2.386*10**(-9) * (temp**2)) / 10000)
 
     def get_specific_heat(self, temp):
         # takes temperature in K
@@ -83,6 +94,48 @@ class CuCrZr(material):
         # returns density in kg m-3
         return 8.75 * 1000
 
+# Jet A-1 properties as plain functions of temperature (K), so that they can
+# also be compiled into the coolant march kernel (see kernels.py)
+# (register_jitable lets other compiled functions call it)
+@register_jitable
+def get_jet_a1_density(temp):
+    # returns density in kg m-3
+    # inter/extra-polated from Figure 9 of AFRL-RQ-WP-TR-2020-0017
+
+    # initially calculate in g cm-3
+    gcm = -0.0007 * temp + 1.0054
+
+    # convert to kg m-3
+    return gcm * 1000
+
+def get_jet_a1_specific_heat(temp):
+    # returns specific heat in J kg-1 K-1
+    # inter/extra-polated from Figure 71 of AFRL-RQ-WP-TR-2020-0017
+
+    # Figure 70
+    return (0.0038 * temp + 0.832) * 1000
+
+def get_jet_a1_viscosity(temp):
+    # returns viscosity in Pa s
+
+    # this function is based on a logarithmic excel fit
+    # of Figure 10 from Edwards_AIAA-2017-0146_Reference_Jet_Fuels.pdf
+
+    # this calculates viscosity in centistokes
+    A = 19.8506
+    B = 3.5317
+    visc_cst = math.exp(math.exp(A-B*math.log(temp))) + 0.7
+
+    # centipoise = centistokes * specific_gravity
+    # now do the conversion
+    visc_cP = visc_cst * (get_jet_a1_density(temp)/997.77)
+
+    # now convert to Pascal second
+    # 1 centipoise = 0.001 Pascal second
+    visc = visc_cP * 0.001
+
+    return visc
+
 # Jet A-1
 # References: James T. Edwards - Jet Fuel Properties
 #                                AFRL-RQ-WP-TR-2020-0017
@@ -111,11 +164,7 @@ class Jet_A1(material):
         # inter/extra-polated from Figure 9 of AFRL-RQ-WP-TR-2020-0017
         #return 0.805 * 1000 # kg m-3
 
-        # initially calculate in g cm-3
-        gcm = -0.0007 * temp + 1.0054
-
-        # convert to kg m-3
-        return gcm * 1000
+        return get_jet_a1_density(temp)
 
     def get_heat_of_combustion(self):
         return 42.8 * 1000 # kJ kg-1
@@ -125,8 +174,7 @@ class Jet_A1(material):
         # returns specific heat in J kg-1 K-1
         # inter/extra-polated from Figure 71 of AFRL-RQ-WP-TR-2020-0017
 
-        # Figure 70
-        return (0.0038 * temp + 0.832) * 1000
+        return get_jet_a1_specific_heat(temp)
 
     def get_specific_gravity(self, temp):
         # Jet A-1 density divided by water density
@@ -135,24 +183,15 @@ class Jet_A1(material):
     def get_viscosity(self, temp):
         # takes temperature in K
         # returns viscosity in Pa s
+        # (temp can also be an array of temperatures)
+        if numpy.ndim(temp):
+            # same fit as get_jet_a1_viscosity()
+            A = 19.8506
+            B = 3.5317
+            visc_cst = numpy.exp(numpy.exp(A-B*numpy.log(temp))) + 0.7
+            return visc_cst * self.get_specific_gravity(temp) * 0.001
 
-        # this function is based on a logarithmic excel fit
-        # of Figure 10 from Edwards_AIAA-2017-0146_Reference_Jet_Fuels.pdf
-
-        # this calculates viscosity in centistokes
-        A = 19.8506
-        B = 3.5317
-        visc_cst = math.exp(math.exp(A-B*math.log(temp))) + 0.7
-
-        # centipoise = centistokes * specific_gravity
-        # now do the conversion
-        visc_cP = visc_cst * self.get_specific_gravity(temp)
-
-        # now convert to Pascal second
-        # 1 centipoise = 0.001 Pascal second
-        visc = visc_cP * 0.001
-
-        return visc
+        return get_jet_a1_viscosity(temp)
 
     def get_thermal_conductivity(self, temp):
         # takes temperature in K
@@ -167,6 +206,12 @@ class Jet_A1(material):
         # should be good enough to roughly approximate things
         return 300000 # J kg-1
 
+    def get_kernel_properties(self):
+        # (density, viscosity, specific heat) as plain functions of
+        # temperature, for the JIT-compiled kernels (see kernels.py)
+        return (get_jet_a1_density, get_jet_a1_viscosity,
+                get_jet_a1_specific_heat)
+
 class water(material):
     def __init__(self):
         self.name = "water"
@@ -7,6 +7,24 @@ import matplotlib.animation as animation
 import matplotlib.pyplot as plt
 
 
+def get_folder_name(filename=None):
+    """Returns the name of the folder the analysis results are exported to.
+
+    :param filename:  (Default value = None)
+
+    """
+    if not filename:
+        folder_name = "heat_analysis_" + datetime.datetime.now().strftime(
+            "%y%m%d%H%M%S")
+    else:
+        if "/" in filename:
+            folder_name = filename.split("/")[2].split(".")[0]
+        else:
+            folder_name = filename.split(".")[0]
+
+    return folder_name
+
+
 def plot_data(
     time_step,
     xs,
@@ -45,6 +63,10 @@ def plot_data(
     total_clt_press_drops,
     vis_model,
     filename=None,
+    time_steady=None,
+    probe_xs=None,
+    probe_data=None,
+    folder_name=None,
 ):
     """
 
@@ -85,6 +107,10 @@ def plot_data(
     :param total_clt_press_drops:
     :param vis_model:
     :param filename:  (Default value = None)
+    :param time_steady:  (Default value = None)
+    :param probe_xs:  (Default value = None)
+    :param probe_data:  (Default value = None)
+    :param folder_name:  (Default value = None)
 
     """
 
@@ -123,6 +149,8 @@ def plot_data(
         ax.yaxis.tick_right()
 
     num_frames = len(cylinder_temps)
+    # plot about 10 frames, or every frame for short analyses
+    frame_step = max(1, int(num_frames / 10))
     fig, ax = plt.subplots()
     plotnum = 0
 
@@ -136,7 +164,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         red = max(min(1, max(cylinder_temps[i]) / 600), 0)
         blue = 1 - red
         ax2.plot(xs, cylinder_temps[i], color=(red, 0, blue))
@@ -176,7 +204,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         red = max(min(1, max(coolant_temps[i]) / 350), 0)
         blue = 1 - red
         ax2.plot(xs, coolant_temps[i], color=(red, 0, blue))
@@ -197,7 +225,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, coolant_presses[i])
 
     plt.grid()
@@ -216,7 +244,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, Q_ins[i], color=(1, 0, 0))
         ax2.plot(xs, Q_outs[i], color=(0, 0, 1))
 
@@ -236,7 +264,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, Q_in_per_areas[i], color=(1, 0, 0))
 
     plt.grid()
@@ -255,7 +283,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, Reynolds[i])
 
     plt.grid()
@@ -274,7 +302,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, Nusselts[i])
 
     plt.grid()
@@ -311,7 +339,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, h_gs[i])
 
     plt.grid()
@@ -330,7 +358,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, h_ls[i])
 
     plt.grid()
@@ -349,7 +377,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, clt_vels[i])
 
     plt.grid()
@@ -367,7 +395,7 @@ def plot_data(
     plt.grid()
     plt.title("Total Q In")
     plt.xlabel("Time")
-    plt.ylabel("Total Q In")
+    plt.ylabel("Total Q In (W)")
 
     # TOTAL Q OUT PLOT
     _, ax = plt.subplots()
@@ -379,7 +407,7 @@ def plot_data(
     plt.grid()
     plt.title("Total Q Out")
     plt.xlabel("Time")
-    plt.ylabel("Total Q Out")
+    plt.ylabel("Total Q Out (W)")
 
     # HEAT PLOT (3D)
     # plt.figure(12)
@@ -486,7 +514,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, T_films[i])
 
     plt.grid()
@@ -505,7 +533,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, rT_layers_plot[i])
 
     plt.grid()
@@ -524,7 +552,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, T_effectives[i])
 
     plt.grid()
@@ -543,7 +571,7 @@ def plot_data(
     ax2.yaxis.set_label_position("left")
     ax2.yaxis.tick_left()
 
-    for i in range(0, num_frames, int(num_frames / 10)):
+    for i in range(0, num_frames, frame_step):
         ax2.plot(xs, coolant_press_drops[i])
 
     plt.grid()
@@ -563,6 +591,42 @@ def plot_data(
     plt.xlabel("Time")
     plt.ylabel("Total Coolant Pressure Drop (Pa)")
 
+    # PROBE HISTORY PLOTS
+    if probe_xs:
+        _, ax = plt.subplots()
+        plotnum += 1
+        plt.figure(plotnum)
+
+        for i in range(len(probe_xs)):
+            plt.plot(
+                probe_data["times"],
+                probe_data["cylinder_temps_in"][:, i],
+                label="x = " + str(round(probe_xs[i], 4)) + " m",
+            )
+
+        plt.grid()
+        plt.legend()
+        plt.title("Probe Inner Wall Surface Temperatures")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Temperature (C)")
+
+        _, ax = plt.subplots()
+        plotnum += 1
+        plt.figure(plotnum)
+
+        for i in range(len(probe_xs)):
+            plt.plot(
+                probe_data["times"],
+                probe_data["coolant_temps"][:, i],
+                label="x = " + str(round(probe_xs[i], 4)) + " m",
+            )
+
+        plt.grid()
+        plt.legend()
+        plt.title("Probe Coolant Temperatures")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Temperature (C)")
+
     # ANIMATED FIGURES
     anims = []
     anim_plotnum = 0
@@ -664,14 +728,8 @@ def plot_data(
 
     print("")
 
-    if not filename:
-        folder_name = "heat_analysis_" + datetime.datetime.now().strftime(
-            "%y%m%d%H%M%S")
-    else:
-        if "/" in filename:
-            folder_name = filename.split("/")[2].split(".")[0]
-        else:
-            folder_name = filename.split(".")[0]
+    if not folder_name:
+        folder_name = get_folder_name(filename)
 
     print("Exporting data to folder: " + folder_name)
 
@@ -690,6 +748,9 @@ def plot_data(
             f.write("ys=" + str(geom_y))
             f.write("\n\n")
             f.write("Engine mass (kg): " + str(m_engine) + "\n\n")
+            if time_steady:
+                f.write("Steady state reached at (s): " + str(time_steady) +
+                        "\n\n")
             # f.write("Min. coolant channel width (m): " + str(L_min_chan_width) + "\n")
             # f.write("Max. coolant channel width (m): " + str(L_max_chan_width) + "\n")
             # f.write("Chamber coolant channel width (m): " + str(L_chamber_chan_width) + "\n")
@@ -699,6 +760,34 @@ def plot_data(
     except:
         print("WARNING: Could not export geometry data.")
 
+    if probe_xs:
+        try:
+            with open(str(folder_name + "/probes.csv"), "w") as f:
+                f.write("time (s)")
+                for x in probe_xs:
+                    for quantity in [
+                            "wall temp. (C)",
+                            "inner wall temp. (C)",
+                            "coolant temp. (C)",
+                            "heat flux (W m-2)",
+                    ]:
+                        f.write(", x=" + str(x) + " " + quantity)
+                f.write("\n")
+
+                for j in range(len(probe_data["times"])):
+                    f.write(str(probe_data["times"][j]))
+                    for i in range(len(probe_xs)):
+                        for name in [
+                                "cylinder_temps",
+                                "cylinder_temps_in",
+                                "coolant_temps",
+                                "Q_in_per_areas",
+                        ]:
+                            f.write(", " + str(probe_data[name][j][i]))
+                    f.write("\n")
+        except:
+            print("WARNING: Could not export probe data.")
+
     try:
         with open(str(folder_name + "/3d_model.txt"), "w") as f:
             for vertex in vis_model:
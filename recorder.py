@@ -0,0 +1,268 @@
+# - - - - - - - - - - - - - - - - - - - -
+# SNAPSHOT RECORDER
+# - - - - - - - - - - - - - - - - - - - -
+# Keeps the recorded analysis data in
+# preallocated (snapshot x station)
+# arrays, either in memory or in .npy
+# files on disk.
+# - - - - - - - - - - - - - - - - - - - -
+import os
+
+import numpy
+from numpy.lib.format import open_memmap
+
+snapshot_stores = ["memory", "disk"]
+
+# quantities recorded at every station in every snapshot
+station_quantities = [
+    "cylinder_temps",
+    "cylinder_temps_out",
+    "cylinder_temps_in",
+    "coolant_temps",
+    "coolant_presses",
+    "Q_ins",
+    "Q_in_per_areas",
+    "Q_outs",
+    "Reynolds",
+    "Nusselts",
+    "h_gs",
+    "h_ls",
+    "clt_vels",
+    "T_films",
+    "rT_layers_plot",
+    "T_effectives",
+    "coolant_press_drops",
+]
+
+# quantities recorded once (for the whole engine) in every snapshot
+scalar_quantities = [
+    "times",
+    "Q_in_fulls",
+    "Q_out_fulls",
+    "total_clt_press_drops",
+]
+
+
+class snapshot_recorder:
+    """Writes snapshots into preallocated arrays by index.
+
+    Every station quantity gets an (n_snapshots x n_stations) array and every
+    scalar quantity an (n_snapshots) array. If more snapshots than expected
+    are recorded, the arrays are doubled in size.
+
+    If i_stations is given, only those stations (probes) are recorded out of
+    the station arrays passed to record().
+    """
+
+    def __init__(self, n_snapshots, n_stations, i_stations=None):
+        """
+
+        :param n_snapshots: expected number of snapshots
+        :param n_stations:
+        :param i_stations: indices of the recorded stations (Default value = None)
+
+        """
+        if i_stations is not None:
+            n_stations = len(i_stations)
+
+        self.n_stations = n_stations
+        self.i_stations = i_stations
+        self.n_allocated = max(1, n_snapshots)
+        self.n_snapshots = 0  # snapshots recorded so far
+
+        self.data = {}
+        for name in station_quantities:
+            self.data[name] = self.allocate(name,
+                                            (self.n_allocated, n_stations))
+        for name in scalar_quantities:
+            self.data[name] = self.allocate(name, (self.n_allocated, ))
+
+    def allocate(self, name, shape):
+        """Returns a new array to record the given quantity in.
+
+        :param name:
+        :param shape:
+
+        """
+        return numpy.zeros(shape)
+
+    def grow(self):
+        """Doubles the number of snapshots that fit into the arrays."""
+        self.n_allocated *= 2
+        for name, old_array in self.data.items():
+            new_array = self.allocate(name, (self.n_allocated, ) +
+                                      old_array.shape[1:])
+            new_array[:self.n_snapshots] = old_array[:self.n_snapshots]
+            self.data[name] = new_array
+
+    def record(self, values):
+        """Writes one snapshot.
+
+        :param values: dict of quantity name -> station array or scalar
+
+        """
+        if self.n_snapshots == self.n_allocated:
+            self.grow()
+
+        for name, value in values.items():
+            if self.i_stations is not None and name in station_quantities:
+                value = value[self.i_stations]
+            self.data[name][self.n_snapshots] = value
+
+        self.n_snapshots += 1
+
+    def get(self, name):
+        """Returns the recorded snapshots of a quantity.
+
+        :param name:
+
+        """
+        return self.data[name][:self.n_snapshots]
+
+    def get_all(self):
+        """Returns a dict of the recorded snapshots of every quantity."""
+        return {name: self.get(name) for name in self.data}
+
+    def get_state(self):
+        """Returns a copy of the recorded snapshots, to resume recording."""
+        state = {"n_snapshots": self.n_snapshots}
+        for name in self.data:
+            state[name] = self.get(name).copy()
+        return state
+
+    def set_state(self, state):
+        """Restores a state returned by get_state().
+
+        :param state:
+
+        """
+        self.n_snapshots = 0
+        while self.n_allocated < state["n_snapshots"]:
+            self.grow()
+
+        self.n_snapshots = state["n_snapshots"]
+        for name in self.data:
+            self.data[name][:self.n_snapshots] = state[name]
+
+
+class disk_snapshot_recorder(snapshot_recorder):
+    """Writes snapshots into memory-mapped .npy files, one per quantity.
+
+    Only the pages being written are kept in memory, so the memory use stays
+    constant no matter how long the run is. The recorded data can be read
+    back lazily with load_snapshot_store().
+    """
+
+    def __init__(self,
+                 folder_name,
+                 n_snapshots,
+                 n_stations,
+                 i_stations=None,
+                 resume=False):
+        """
+
+        :param folder_name: folder to keep the .npy files in
+        :param n_snapshots: expected number of snapshots
+        :param n_stations:
+        :param i_stations: indices of the recorded stations (Default value = None)
+        :param resume: keep recording into existing files (Default value = False)
+
+        """
+        self.folder_name = folder_name
+        self.resume = resume
+        if not os.path.exists(folder_name):
+            os.makedirs(folder_name)
+
+        super().__init__(n_snapshots, n_stations, i_stations)
+
+    def get_path(self, name):
+        """
+
+        :param name:
+
+        """
+        return os.path.join(self.folder_name, name + ".npy")
+
+    def allocate(self, name, shape):
+        """Returns a new memory-mapped array to record the given quantity in.
+
+        :param name:
+        :param shape:
+
+        """
+        if self.resume and os.path.exists(self.get_path(name)):
+            return open_memmap(self.get_path(name), mode="r+")
+
+        return open_memmap(self.get_path(name),
+                           mode="w+",
+                           dtype=numpy.float64,
+                           shape=shape)
+
+    def grow(self):
+        """Doubles the number of snapshots that fit into the files."""
+        self.n_allocated *= 2
+        for name in list(self.data):
+            old_array = self.data[name]
+            new_path = self.get_path(name + "_grow")
+            new_array = open_memmap(
+                new_path,
+                mode="w+",
+                dtype=numpy.float64,
+                shape=(self.n_allocated, ) + old_array.shape[1:],
+            )
+            new_array[:self.n_snapshots] = old_array[:self.n_snapshots]
+            new_array.flush()
+
+            # release the old mapping before its file is replaced
+            del self.data[name], old_array
+            del new_array
+            os.replace(new_path, self.get_path(name))
+            self.data[name] = open_memmap(self.get_path(name), mode="r+")
+
+    def get_state(self):
+        """Flushes the files and returns the recording position. The recorded
+        data itself stays in the files."""
+        for array in self.data.values():
+            array.flush()
+        return {"n_snapshots": self.n_snapshots}
+
+    def set_state(self, state):
+        """Restores a state returned by get_state(). The recorder must have
+        been created with resume=True.
+
+        :param state:
+
+        """
+        self.n_allocated = len(self.data["times"])
+        self.n_snapshots = state["n_snapshots"]
+        while self.n_allocated < self.n_snapshots:
+            self.grow()
+
+    def close(self):
+        """Flushes the files and stores the number of recorded snapshots."""
+        for array in self.data.values():
+            array.flush()
+
+        with open(os.path.join(self.folder_name, "n_snapshots.txt"),
+                  "w") as f:
+            f.write(str(self.n_snapshots))
+
+
+def load_snapshot_store(folder_name):
+    """Returns a dict of read-only memory-mapped arrays of a snapshot store
+    written by disk_snapshot_recorder. Nothing is read into memory until the
+    arrays are indexed.
+
+    :param folder_name:
+
+    """
+    with open(os.path.join(folder_name, "n_snapshots.txt")) as f:
+        n_snapshots = int(f.read())
+
+    data = {}
+    for name in station_quantities + scalar_quantities:
+        path = os.path.join(folder_name, name + ".npy")
+        if os.path.exists(path):
+            data[name] = numpy.load(path, mmap_mode="r")[:n_snapshots]
+
+    return data
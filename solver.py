@@ -0,0 +1,1068 @@
+# - - - - - - - - - - - - - - - - - - - -
+# TRANSIENT WALL / COOLANT SOLVER
+# - - - - - - - - - - - - - - - - - - - -
+# Time-step kernel working on a
+# wall_segments structure-of-arrays.
+# - - - - - - - - - - - - - - - - - - - -
+import math
+from collections import deque
+
+import numpy
+
+from film_coeff import get_convection_coeff_factor
+from film_coeff import get_h_clt_dittus_boelter
+from kernels import get_kernel_backend
+from kernels import get_march_coolant
+from kernels import get_solve_banded
+
+pi = math.pi
+euler = math.e
+
+time_integrators = ["explicit", "implicit", "cn"]
+
+# changes whenever the solver computes different results or the cached stage
+# results change, so that results cached by older versions aren't used
+solver_version = "3"
+
+# transient_solver attributes set by a coolant march
+coolant_results = [
+    "T_clt_stations",
+    "P_clt_stations",
+    "Reynolds",
+    "Nusselt",
+    "clt_vel",
+    "press_drop",
+]
+
+
+def solve_tridiagonal(lower, diag, upper, rhs):
+    """Solves a tridiagonal linear system with the Thomas algorithm.
+
+    :param lower: sub-diagonal (length n-1)
+    :param diag: main diagonal (length n)
+    :param upper: super-diagonal (length n-1)
+    :param rhs: right hand side (length n)
+
+    """
+    n = len(diag)
+    lower = list(lower)
+    diag = list(diag)
+    upper = list(upper) + [0.0]
+    rhs = list(rhs)
+
+    c = [0.0] * n
+    d = [0.0] * n
+    c[0] = upper[0] / diag[0]
+    d[0] = rhs[0] / diag[0]
+    for i in range(1, n):
+        m = diag[i] - lower[i - 1] * c[i - 1]
+        c[i] = upper[i] / m
+        d[i] = (rhs[i] - lower[i - 1] * d[i - 1]) / m
+
+    x = [0.0] * n
+    x[-1] = d[-1]
+    for i in range(n - 2, -1, -1):
+        x[i] = d[i] - c[i] * x[i + 1]
+
+    return numpy.array(x)
+
+
+def get_film_mixing_temps(T_films, is_filmInject, T_clt_in):
+    """Returns the film coolant temp. the mixing layer of every station is
+    computed with, once the liquid film has vaporised.
+
+    Going from the nozzle exit towards the injector face, this is the temp.
+    the film leaves the film march with, until the first film injector is
+    reached. From there on it is the temp. of the coolant entering that
+    injector's station, until the next injector. The inputs can have a
+    leading design axis.
+
+    :param T_films: film temps. of the film march
+    :param is_filmInject: whether a film cooling injector is fed at a station
+    :param T_clt_in: coolant temp. entering each station
+
+    """
+    n = is_filmInject.shape[-1]
+
+    # index of the closest injector station at or downstream of every
+    # station, n if there is none (which picks the film march temp.)
+    i_injects = numpy.where(is_filmInject, numpy.arange(n), n)
+    i_next = numpy.minimum.accumulate(i_injects[..., ::-1], -1)[..., ::-1]
+
+    T_candidates = numpy.append(T_clt_in, T_films[..., -1:], -1)
+    return numpy.take_along_axis(T_candidates, i_next, -1)
+
+
+class convergence_monitor:
+    """Watches a transient run and tells when it has reached steady state.
+
+    The run is considered steady once, over the last `window` steps, the
+    fastest wall temperature change stayed below tol_dTdt (K s-1) and the
+    net heat taken in by the wall (Q_in_full - Q_out_full) stayed below
+    tol_imbalance as a fraction of the heat going in or out, whichever is
+    larger.
+    """
+
+    def __init__(self, tol_dTdt, tol_imbalance=0.01, window=100):
+        """
+
+        :param tol_dTdt:
+        :param tol_imbalance:  (Default value = 0.01)
+        :param window:  (Default value = 100)
+
+        """
+        self.tol_dTdt = tol_dTdt
+        self.tol_imbalance = tol_imbalance
+        self.window = window
+
+        self.max_dTdts = deque(maxlen=window)
+        self.Q_in_fulls = deque(maxlen=window)
+        self.Q_out_fulls = deque(maxlen=window)
+        self.T_prev = None
+
+    def update(self, T, time_step, Q_in_full, Q_out_full):
+        """Adds a finished time step to the window and returns True if the
+        run has converged.
+
+        :param T: wall temperatures after the step
+        :param time_step:
+        :param Q_in_full: heat taken in from the gas during the step
+        :param Q_out_full: heat given to the coolant during the step
+
+        """
+        if self.T_prev is not None:
+            self.max_dTdts.append(
+                numpy.max(numpy.abs(T - self.T_prev)) / time_step)
+            self.Q_in_fulls.append(Q_in_full)
+            self.Q_out_fulls.append(Q_out_full)
+        self.T_prev = T.copy()
+
+        if len(self.max_dTdts) < self.window:
+            return False
+
+        return (max(self.max_dTdts) < self.tol_dTdt
+                and self.get_imbalance() < self.tol_imbalance)
+
+    def get_state(self):
+        """Returns a copy of the window, to continue watching a resumed run."""
+        return {
+            "T_prev": (self.T_prev.copy()
+                       if self.T_prev is not None else numpy.zeros(0)),
+            "max_dTdts": list(self.max_dTdts),
+            "Q_in_fulls": list(self.Q_in_fulls),
+            "Q_out_fulls": list(self.Q_out_fulls),
+        }
+
+    def set_state(self, state):
+        """Restores a state returned by get_state().
+
+        :param state:
+
+        """
+        if len(state["T_prev"]):
+            self.T_prev = numpy.array(state["T_prev"])
+        else:
+            self.T_prev = None
+        self.max_dTdts = deque(state["max_dTdts"], maxlen=self.window)
+        self.Q_in_fulls = deque(state["Q_in_fulls"], maxlen=self.window)
+        self.Q_out_fulls = deque(state["Q_out_fulls"], maxlen=self.window)
+
+    def get_imbalance(self):
+        """Returns the net heat taken in by the wall over the window as a
+        fraction of the larger of the heat coming in and going out."""
+        Q_in_window = sum(self.Q_in_fulls)
+        Q_out_window = sum(self.Q_out_fulls)
+        Q_scale = max(abs(Q_in_window), abs(Q_out_window),
+                      numpy.finfo(float).tiny)
+        return abs(Q_in_window - Q_out_window) / Q_scale
+
+
+class transient_solver:
+    """Advances the wall temperatures of a wall_segments object in time.
+
+    Gas-side heating and the wall update are done for all stations at once
+    with array operations. Only the film cooling and coolant marches, where
+    each station depends on the one before it, still loop over the stations.
+
+    After every step() the per-station results of that step are available
+    as attributes (Q_in, Q_out, T_clt, P_clt, h_g, ...) for recording.
+    """
+
+    def __init__(
+        self,
+        segs,
+        x_thrt,
+        D_star,
+        r_c,
+        A_star,
+        P_c,
+        T_c,
+        c_star,
+        props_chm,
+        props_thrt,
+        mtl_clt,
+        mdot_clt,
+        T_clt,
+        P_clt,
+        mdot_chamber,
+        film_injects,
+        integrator="explicit",
+        film_tol=0,
+        coolant_interval=1,
+        coolant_tol=None,
+        kernel_backend="python",
+        wall=None,
+    ):
+        """
+
+        :param segs: wall_segments to be solved
+        :param x_thrt: throat position (m)
+        :param D_star:
+        :param r_c:
+        :param A_star:
+        :param P_c:
+        :param T_c:
+        :param c_star:
+        :param props_chm: (vis, gamma, Cp, Pr) of the combustion chamber
+        :param props_thrt: (vis, gamma, Cp, Pr) of the throat
+        :param mtl_clt:
+        :param mdot_clt: coolant mass flow per channel
+        :param T_clt: manifold coolant temp.
+        :param P_clt: manifold coolant press.
+        :param mdot_chamber:
+        :param film_injects: list of (L_filmInject, mdot_filmInject) of the
+            film cooling injectors
+        :param integrator: one of time_integrators (Default value = "explicit")
+        :param film_tol: change of the film injection temp. (K) below which
+            the film march is not repeated (Default value = 0)
+        :param coolant_interval: number of steps the coolant march result is
+            used for (Default value = 1)
+        :param coolant_tol: change of the wall temps. (K) that makes the
+            coolant march be repeated early (Default value = None)
+        :param kernel_backend: one of kernels.kernel_backends, used for the
+            coolant march and the radial wall (Default value = "python")
+        :param wall: radial_wall of segs, to resolve the temps. across the
+            wall (Default value = None)
+
+        """
+        self.segs = segs
+        self.integrator = integrator
+        self.x_thrt = x_thrt
+        self.D_star = D_star
+        self.r_c = r_c
+        self.A_star = A_star
+        self.P_c = P_c
+        self.T_c = T_c
+        self.c_star = c_star
+        self.props_chm = props_chm
+        self.props_thrt = props_thrt
+
+        self.mtl_clt = mtl_clt
+        self.n_cochan = segs.n_clt
+        self.mdot_clt = mdot_clt
+        self.T_clt = T_clt
+        self.P_clt = P_clt
+
+        self.mdot_chamber = mdot_chamber
+        self.film_injects = film_injects
+
+        self.T_film = 350  # initial guess for the first cycle
+        self.film_tol = film_tol
+
+        # last film march result (film_exists, rT_layers, T_films) and the
+        # injection temp. it was computed for
+        self.film_profile = None
+        self.T_film_marched = None
+
+        # the coolant march is quasi-steady, so its result can be reused for
+        # a few wall steps (multi-rate)
+        self.coolant_interval = coolant_interval
+        self.coolant_tol = coolant_tol
+        self.T_wall_cooled = None  # wall temps. of the last coolant march
+        self.n_steps_uncooled = 0  # steps taken since the last coolant march
+        self.time_step = None  # length of the last step taken
+
+        self.kernel_backend = get_kernel_backend(kernel_backend, mtl_clt)
+        self.march_coolant_kernel, self.clt_props = get_march_coolant(
+            self.kernel_backend, mtl_clt)
+        self.solve_banded_kernel = get_solve_banded(self.kernel_backend)
+
+        # the radial wall is always integrated implicitly, its thin layers
+        # would need tiny explicit time steps
+        self.wall = wall
+
+        n = len(segs)
+
+        # coolant channel geometry
+        # https://en.wikipedia.org/wiki/Hydraulic_diameter
+        self.wet_perimeter = numpy.full(n, segs.a_clt + 2 * segs.b_clt)
+        self.flow_area = segs.A_cochan_flow
+        self.D_hydro = 4 * (self.flow_area / self.wet_perimeter)
+
+        # coolant is bled off to the film cooling injectors on its way from
+        # the nozzle exit manifold towards the injector face
+        self.mdot_clts = numpy.full(n, float(mdot_clt))
+        self.i_filmInjects = []
+        for L_filmInject, mdot_filmInject in film_injects:
+            upstream = segs.x <= L_filmInject
+            if upstream.any():
+                self.mdot_clts[upstream] -= mdot_filmInject / self.n_cochan
+                self.i_filmInjects.append(int(numpy.nonzero(upstream)[0][-1]))
+        self.is_filmInject = numpy.zeros(n, dtype=bool)
+        self.is_filmInject[self.i_filmInjects] = True
+
+        # the Dittus-Boelter coefficient is evaluated at the manifold
+        # temperature, so it does not change between time steps
+        if not mdot_clt == 0:
+            self.h_l = get_h_clt_dittus_boelter(mtl_clt, T_clt,
+                                                self.mdot_clts, self.D_hydro,
+                                                segs)
+            self.Pr_clt = (mtl_clt.get_specific_heat(T_clt) *
+                           mtl_clt.get_viscosity(T_clt) /
+                           mtl_clt.get_thermal_conductivity(T_clt))
+        else:
+            self.h_l = numpy.zeros(n)
+            self.Pr_clt = 0
+
+        self.precompute_gas_side()
+        self.precompute_film()
+
+    def precompute_gas_side(self):
+        """Computes everything on the gas side that only depends on the
+        geometry, so that a time step only has to evaluate the wall
+        temperature correction (sigma) of the Bartz equation.
+
+        Must be called again if the stations of segs change."""
+        segs = self.segs
+
+        self.vis, self.gamma, self.Cp, self.Pr = self.get_gas_props()
+        self.A_gas = pi * segs.r_in**2
+
+        # stagnation to static temperature ratio
+        stag_ratio = 1 + (self.gamma - 1) / 2 * segs.Mach**2
+        self.T_gas = self.T_c / stag_ratio
+
+        # h_g = h_g_factor * sigma_num / (sigma_coeff * T_w + 0.5)**0.68
+        self.h_g_factor = get_convection_coeff_factor(self.D_star, self.vis,
+                                                      self.Cp, self.Pr,
+                                                      self.P_c, self.c_star,
+                                                      self.r_c, self.A_star,
+                                                      self.A_gas)
+        self.sigma_coeff = 0.5 * stag_ratio / self.T_c
+        self.sigma_num = self.h_g_factor * stag_ratio**0.12
+
+    def precompute_film(self):
+        """Computes the film cooling data that only depends on the geometry,
+        for every station: the film mass flow injected there (mdot_injected)
+        and upstream of it (mdot_films), and the gas-film mixing layer ratio
+        T_film/T_gas once the liquid film has vaporised (rT_mixing).
+
+        The mixing layer of a station is measured from the last injector in
+        film_injects upstream of it. Must be called again if the stations of
+        segs change."""
+        segs = self.segs
+        n = len(segs)
+
+        self.mdot_injected = numpy.zeros(n)
+        self.mdot_films = numpy.zeros(n)
+        L_mixing = numpy.zeros(n)  # start of the mixing layer
+
+        for L_filmInject, mdot_filmInject in self.film_injects:
+            downstream = segs.x >= L_filmInject
+            self.mdot_films[downstream] += mdot_filmInject
+            L_mixing[downstream] = L_filmInject
+            if downstream.any():
+                self.mdot_injected[numpy.argmax(downstream)] += mdot_filmInject
+
+        # no film without liquid
+        self.mdot_films[self.mdot_films <= 0] = 0
+
+        self.rT_mixing = numpy.ones(n)
+        mixing = self.mdot_films > 0
+        r_in = segs.r_in[mixing]
+        mdot_films = self.mdot_films[mixing]
+
+        Hs = 0.025 * r_in
+        # coefficient for intensity of turbulent mixing
+        Kt = 0.12 * 10**(-2)
+        # every time you adjust this parameter, a kitten dies.
+
+        mbar_f = mdot_films / (self.mdot_chamber + mdot_films)
+        A_surface_layer = pi * r_in**2 - pi * (r_in - Hs)**2
+        mdot_surface_layer = (A_surface_layer /
+                              (pi * r_in**2)) * self.mdot_chamber
+        mbar_s = mdot_surface_layer / (self.mdot_chamber + mdot_films)
+        x_squared = (segs.x[mixing] - L_mixing[mixing]) / Hs
+        bigM = Kt * (mbar_s / mbar_f)
+        self.rT_mixing[mixing] = 1 - euler**(-x_squared * bigM)
+
+    def get_h_g(self, T_w):
+        """Returns the Bartz gas-side heat transfer coefficient of every
+        station for the wall temperatures T_w.
+
+        :param T_w:
+
+        """
+        return self.sigma_num / (self.sigma_coeff * T_w + 0.5)**0.68
+
+    def get_gas_props(self):
+        """Returns (vis, gamma, Cp, Pr) arrays for every station."""
+        before_throat = self.segs.x < self.x_thrt
+        return [
+            numpy.where(before_throat, p_chm, p_thrt)
+            for p_chm, p_thrt in zip(self.props_chm, self.props_thrt)
+        ]
+
+    def march_film(self, T_film):
+        """Loops forwards from the injector face to compute film cooling.
+
+        The film march only depends on the film injection temp., not on the
+        wall temperatures. Where the liquid film has completely vaporised,
+        the precomputed mixing layer ratios (rT_mixing) take over.
+
+        :param T_film: film coolant temp. at injection
+
+        """
+        mtl_clt = self.mtl_clt
+        n = len(self.segs)
+
+        film_exists = numpy.zeros(n, dtype=bool)
+        vaporised = numpy.zeros(n, dtype=bool)
+        T_films = numpy.empty(n)
+
+        A_chms = self.segs.A_chm.tolist()
+        T_gas = self.T_gas.tolist()
+        sigma_nums = self.sigma_num.tolist()
+        sigma_coeffs = self.sigma_coeff.tolist()
+        mdot_films = self.mdot_films.tolist()
+        mdot_injected = self.mdot_injected.tolist()
+
+        mdot_film_current = 0
+
+        for i in range(n):
+            # no film yet
+            if not mdot_films[i]:
+                T_films[i] = T_film
+                continue
+
+            # film injection here
+            mdot_film_current += mdot_injected[i]
+
+            # calculate heat transfer coeff
+            h_g = sigma_nums[i] / (sigma_coeffs[i] * T_film + 0.5)**0.68
+
+            stability_coeff = 0.6
+            dT_film = h_g * (T_gas[i] - T_film) * A_chms[i]
+            dT_film *= (stability_coeff * mdot_films[i] *
+                        mtl_clt.get_specific_heat(T_film))**(-1)
+
+            if T_film + dT_film < 600:  # TODO: add this to material properties
+                T_film += dT_film  # increase film temperature
+                film_exists[i] = True
+
+            else:  # check vaporization
+                dmdot_film = (h_g * (T_gas[i] - T_film) *
+                              A_chms[i]) / mtl_clt.get_heat_of_vaporization(T_film)
+
+                if (mdot_film_current - dmdot_film
+                        > 0):  # still not completely vaporized
+                    mdot_film_current -= dmdot_film
+                    film_exists[i] = True
+
+                # liquid film has completely vaporized (and is now in gas form)
+                else:
+                    mdot_film_current = 0
+                    vaporised[i] = True
+
+            T_films[i] = T_film
+
+        rT_layers = numpy.where(vaporised, self.rT_mixing, 1.0)
+
+        return film_exists, rT_layers, T_films
+
+    def march_coolant(self, time_step):
+        """Loops backwards from the nozzle exit manifold to the injector face
+        to compute the heat absorbed by the regen cooling channels.
+
+        :param time_step:
+
+        """
+        segs = self.segs
+        n = len(segs)
+
+        T_colds = segs.T - segs.T_diff / 2
+        inputs = [
+            T_colds, self.mdot_clts, self.h_l, segs.A_clt, self.flow_area,
+            self.D_hydro, segs.h, self.is_filmInject
+        ]
+        # Q_outs, T_clts, P_clts, Reynolds, clt_vels, press_drops
+        results = [numpy.zeros(n) for i in range(6)]
+
+        if self.kernel_backend == "python":
+            # element access is a lot faster on lists than on arrays
+            inputs = [array.tolist() for array in inputs]
+            results = [array.tolist() for array in results]
+
+        self.T_film = self.march_coolant_kernel(
+            *inputs,
+            float(self.T_clt),
+            float(self.P_clt),
+            self.T_film,
+            time_step,
+            self.n_cochan,
+            not self.mdot_clt == 0,
+            *self.clt_props,
+            *results,
+        )
+
+        return tuple(numpy.asarray(result) for result in results)
+
+    def get_axial_conductances(self):
+        """Returns the axial thermal conductance (W K-1) of every station
+        interface."""
+        segs = self.segs
+        k_axial = segs.mtl.get_thermal_conductivity(segs.T[segs.i_dn])
+        return k_axial * segs.A_axial[segs.i_dn] / segs.dx_axial
+
+    def conduct_axial(self, time_step):
+        """Axial conduction of heat (positive direction is from nozzle exit
+        towards injector face), computed over all station interfaces at once.
+
+        :param time_step:
+
+        """
+        segs = self.segs
+        i_up = segs.i_up
+        i_dn = segs.i_dn
+
+        dT_axial = segs.T[i_dn] - segs.T[i_up]
+        Q_axial = self.get_axial_conductances() * dT_axial * time_step
+
+        # every interface takes heat from its downstream station and gives
+        # it to its upstream one
+        n = len(segs)
+        Q_net = numpy.bincount(i_up, Q_axial, n) - numpy.bincount(
+            i_dn, Q_axial, n)
+        segs.T += Q_net / segs.get_heat_capacity()
+
+    def update_wall_implicit(self, time_step, h_gA, T_effective, h_lA,
+                             T_clt_in):
+        """Updates the wall temperatures with backward-Euler ("implicit") or
+        Crank-Nicolson ("cn") time integration.
+
+        Gas-side and coolant-side convection plus axial conduction make up a
+        tridiagonal system along the engine. The coefficients and the coolant
+        temperatures are taken from the start of the step.
+
+        Returns the heat taken in from the gas and given to the coolant
+        during the step (J) at every station.
+
+        With time_step=None the steady state (an infinitely long step) is
+        solved instead and the returned heat flows are in W.
+
+        :param time_step:
+        :param h_gA: gas-side conductance per station (W K-1)
+        :param T_effective:
+        :param h_lA: coolant-side conductance per station (W K-1)
+        :param T_clt_in: coolant temp. entering each station
+
+        """
+        if self.integrator == "cn" and time_step:
+            theta = 0.5
+        else:
+            theta = 1
+
+        segs = self.segs
+        n = len(segs)
+        i_up = segs.i_up
+        i_dn = segs.i_dn
+
+        T_old = segs.T.copy()
+        C = segs.get_heat_capacity()
+        G = self.get_axial_conductances()
+
+        # net heat flow into each station is -a * T + b + axial conduction
+        a = h_gA + h_lA
+        b = (h_gA * (T_effective - segs.T_diff / 2) + h_lA *
+             (T_clt_in + segs.T_diff / 2))
+        G_sum = numpy.bincount(i_up, G, n) + numpy.bincount(i_dn, G, n)
+
+        Q_axial_old = G * (T_old[i_dn] - T_old[i_up])
+        F_old = (-a * T_old + b + numpy.bincount(i_up, Q_axial_old, n) -
+                 numpy.bincount(i_dn, Q_axial_old, n))
+
+        if time_step:
+            C_per_step = C / time_step
+        else:
+            C_per_step = 0
+            time_step = 1
+
+        diag = C_per_step + theta * (a + G_sum)
+        off_diag = -theta * G
+        rhs = C_per_step * T_old + theta * b + (1 - theta) * F_old
+        segs.T = solve_tridiagonal(off_diag, diag, off_diag, rhs)
+
+        T_avg = theta * segs.T + (1 - theta) * T_old
+        Q_in = h_gA * (T_effective - (T_avg + segs.T_diff / 2)) * time_step
+        Q_out = h_lA * ((T_avg - segs.T_diff / 2) - T_clt_in) * time_step
+
+        return Q_in, Q_out
+
+    def update_wall_radial(self, time_step, h_gA, T_effective, T_clt_in):
+        """Updates the node temps. of the radial wall with backward-Euler
+        (Crank-Nicolson with the "cn" integrator) time integration, and the
+        wall temps. of segs from its surface temps.
+
+        Radial conduction between the nodes of a station and axial
+        conduction between the same nodes of neighbouring stations make up a
+        banded system (the nodes of a station are numbered one after the
+        other), with gas-side convection into the first node and coolant
+        convection out of the channel bottom and rib nodes. The coefficients
+        and the coolant temperatures are taken from the start of the step.
+
+        Returns the heat taken in from the gas and given to the coolant
+        during the step (J) at every station, or with time_step=None the
+        steady state and heat flows in W, like update_wall_implicit().
+
+        :param time_step:
+        :param h_gA: gas-side conductance per station (W K-1)
+        :param T_effective:
+        :param T_clt_in: coolant temp. entering each station
+
+        """
+        if self.integrator == "cn" and time_step:
+            theta = 0.5
+        else:
+            theta = 1
+
+        wall = self.wall
+        segs = self.segs
+        n, m = wall.T.shape
+        i_up = segs.i_up
+        i_dn = segs.i_dn
+
+        T_old = wall.T.copy()
+        C = wall.get_heat_capacities()
+        wall.update_conductances(h_gA, self.h_l, segs.dx_axial, i_dn)
+        G_radial = wall.G_radial
+        G_axial = wall.G_axial
+
+        # net heat flow into each node is -G_sum * T + b + conduction from
+        # its neighbours
+        G_sum = numpy.zeros((n, m))
+        b = numpy.zeros((n, m))
+        for k, G, T_fluid in [(0, wall.G_gas, T_effective),
+                              (wall.i_bottom, wall.G_bottom, T_clt_in),
+                              (wall.i_rib, wall.G_side, T_clt_in)]:
+            G_sum[:, k] += G
+            b[:, k] += G * T_fluid
+        G_sum[:, :-1] += G_radial
+        G_sum[:, 1:] += G_radial
+        G_sum[i_up] += G_axial
+        G_sum[i_dn] += G_axial
+
+        F_old = b - G_sum * T_old
+        F_old[:, :-1] += G_radial * T_old[:, 1:]
+        F_old[:, 1:] += G_radial * T_old[:, :-1]
+        F_old[i_up] += G_axial * T_old[i_dn]
+        F_old[i_dn] += G_axial * T_old[i_up]
+
+        if time_step:
+            C_per_step = C / time_step
+        else:
+            C_per_step = 0
+            time_step = 1
+
+        # bands[p][m + q - p] couples node p = i * m + k to node q, radial
+        # neighbours are 1 apart and axial ones m
+        bands = numpy.zeros((n * m, 2 * m + 1))
+        bands[:, m] = (C_per_step + theta * G_sum).ravel()
+        radial = numpy.zeros((n, m))
+        radial[:, :-1] = -theta * G_radial
+        bands[:, m + 1] = radial.ravel()
+        bands[1:, m - 1] = radial.ravel()[:-1]
+        axial = numpy.zeros((n, m))
+        axial[i_up] = -theta * G_axial
+        bands[:, 2 * m] = axial.ravel()
+        bands[m:, 0] = axial.ravel()[:-m]
+        rhs = (C_per_step * T_old + theta * b + (1 - theta) * F_old).ravel()
+        T_new = numpy.zeros(n * m)
+
+        if self.kernel_backend == "python":
+            # element access is a lot faster on lists than on arrays
+            bands = bands.tolist()
+            rhs = rhs.tolist()
+            T_new = T_new.tolist()
+        self.solve_banded_kernel(bands, rhs, m, T_new)
+        wall.T = numpy.reshape(T_new, (n, m))
+
+        T_avg = theta * wall.T + (1 - theta) * T_old
+        Q_in = wall.G_gas * (T_effective - T_avg[:, 0]) * time_step
+        Q_out = (wall.G_bottom * (T_avg[:, wall.i_bottom] - T_clt_in) +
+                 wall.G_side * (T_avg[:, wall.i_rib] - T_clt_in)) * time_step
+
+        self.set_wall_surface_temps(T_effective, T_clt_in)
+
+        return Q_in, Q_out
+
+    def set_wall_surface_temps(self, T_effective, T_clt_in):
+        """Sets the wall temps. of segs from the surface temps. of the radial
+        wall: T is their mean and T_diff the drop across the wall.
+
+        :param T_effective:
+        :param T_clt_in: coolant temp. entering each station
+
+        """
+        T_hot, T_cold = self.wall.get_surface_temps(T_effective, T_clt_in)
+        self.segs.T = (T_hot + T_cold) / 2
+        self.segs.T_diff = T_hot - T_cold
+
+    def heat_gas_side(self):
+        """Computes the gas-side heating of every station for the current
+        wall temperatures and stores it in h_g, T_films, rT_layers and
+        film_exists. The effective gas temps. also need the coolant march,
+        see heat_film_mixing()."""
+        segs = self.segs
+
+        if self.mdot_films.any():
+            # the film profile is reused until the injection temp. changes
+            if (self.T_film_marched is None or
+                    abs(self.T_film - self.T_film_marched) > self.film_tol):
+                self.film_profile = self.march_film(self.T_film)
+                self.T_film_marched = self.T_film
+            film_exists, rT_layers, T_films = self.film_profile
+        else:
+            film_exists = numpy.zeros(len(segs), dtype=bool)
+            rT_layers = numpy.ones(len(segs))
+            T_films = numpy.full(len(segs), self.T_film)
+
+        # calculate heat transfer
+        self.h_g = self.get_h_g(segs.T)
+        self.T_films = T_films
+        self.rT_layers = rT_layers
+        self.film_exists = film_exists
+
+    def heat_film_mixing(self):
+        """Computes the effective gas temps. (T_effective) behind the film
+        mixing layer and the gas-side heat flux (Q_in_per_area) of every
+        station, from heat_gas_side() and the coolant temps. of the last
+        coolant march (see get_film_mixing_temps())."""
+        segs = self.segs
+        T_gas = self.T_gas
+        T_mixing = get_film_mixing_temps(self.T_films, self.is_filmInject,
+                                         self.get_T_clt_in())
+
+        T_effective = numpy.minimum(T_mixing + self.rT_layers *
+                                    (T_gas - T_mixing), T_gas)
+
+        self.T_effective = T_effective
+        # W per m2 (no heat reaches the wall under a liquid film)
+        self.Q_in_per_area = numpy.where(
+            self.film_exists, 0,
+            self.h_g * (T_effective - (segs.T + segs.T_diff / 2)))
+
+    def cool(self, time_step):
+        """Runs the coolant march and stores its results in T_clt_stations,
+        P_clt_stations, Reynolds, Nusselt, clt_vel and press_drop.
+
+        Returns the heat given to the coolant at every station (J).
+
+        :param time_step:
+
+        """
+        Q_out, T_clt, P_clt, Reynolds, clt_vel, press_drop = self.march_coolant(
+            time_step)
+
+        # compute Nusselt number (Dittus Boelter)
+        if not self.mdot_clt == 0:
+            self.Nusselt = 0.023 * Reynolds**0.8 * self.Pr_clt**0.3
+        else:
+            self.Nusselt = numpy.zeros(len(self.segs))
+
+        self.T_clt_stations = T_clt
+        self.P_clt_stations = P_clt
+        self.Reynolds = Reynolds
+        self.clt_vel = clt_vel
+        self.press_drop = press_drop
+
+        self.T_wall_cooled = self.segs.T.copy()
+        self.n_steps_uncooled = 0
+
+        return Q_out
+
+    def needs_coolant_march(self):
+        """Returns True if the last coolant march result is too old (or the
+        wall has changed too much since) to be used for the next step."""
+        if self.T_wall_cooled is None:
+            return True
+        if self.n_steps_uncooled >= self.coolant_interval - 1:
+            return True
+        if self.coolant_tol is not None:
+            dT_wall = numpy.max(numpy.abs(self.segs.T - self.T_wall_cooled))
+            return dT_wall > self.coolant_tol
+        return False
+
+    def cool_quasi_steady(self, time_step):
+        """Returns the heat given to the coolant at every station (J) for the
+        current wall temps., keeping the coolant temps. of the last march.
+
+        :param time_step:
+
+        """
+        segs = self.segs
+        T_cold = segs.T - segs.T_diff / 2
+        self.n_steps_uncooled += 1
+        return self.h_l * (T_cold -
+                           self.get_T_clt_in()) * segs.A_clt * time_step
+
+    def get_T_clt_in(self):
+        """Returns the coolant temp. entering each station, which comes from
+        its downstream neighbour (or the manifold)."""
+        return numpy.append(self.T_clt_stations[1:], self.T_clt)
+
+    def update_wall_linear(self, time_step):
+        """Updates the wall temperatures through update_wall_implicit() using
+        the gas-side and coolant results computed for the current step.
+
+        :param time_step:
+
+        """
+        segs = self.segs
+        h_gA = numpy.where(self.film_exists, 0, self.h_g * segs.A_chm)
+        if self.wall is not None:
+            return self.update_wall_radial(time_step, h_gA, self.T_effective,
+                                           self.get_T_clt_in())
+        h_lA = self.h_l * segs.A_clt
+        return self.update_wall_implicit(time_step, h_gA, self.T_effective,
+                                         h_lA, self.get_T_clt_in())
+
+    def step(self, time_step):
+        """Advances the whole engine wall by one time step.
+
+        :param time_step:
+
+        """
+        segs = self.segs
+
+        self.heat_gas_side()
+        if self.needs_coolant_march():
+            Q_out = self.cool(time_step)
+        else:
+            Q_out = self.cool_quasi_steady(time_step)
+        self.heat_film_mixing()
+        Q_in = self.Q_in_per_area * segs.A_chm * time_step
+
+        if self.integrator == "explicit" and self.wall is None:
+            # increase cylinder temps
+            Q_net = Q_in - Q_out
+            segs.T += Q_net / segs.get_heat_capacity()
+            self.conduct_axial(time_step)
+
+        else:
+            Q_in, Q_out = self.update_wall_linear(time_step)
+            self.Q_in_per_area = Q_in / (segs.A_chm * time_step)
+            Q_net = Q_in - Q_out
+
+        # the radial wall has set T_diff from its surface temps. already
+        if not self.mdot_clt == 0 and self.wall is None:
+            segs.T_diff = Q_net * segs.get_thermal_resistance() / time_step
+
+        self.Q_in = Q_in
+        self.Q_out = Q_out
+        self.time_step = time_step
+
+    def get_state(self):
+        """Returns a copy of everything step() needs to continue the run."""
+        state = {
+            "x": self.segs.x,  # lets other designs warm start from the state
+            "T": self.segs.T.copy(),
+            "T_diff": self.segs.T_diff.copy(),
+            "T_film": self.T_film,
+        }
+        if self.wall is not None:
+            state["T_nodes"] = self.wall.T.copy()
+
+        # the last coolant march result, kept for multi-rate stepping (its
+        # arrays are never changed in place either)
+        if self.T_wall_cooled is not None:
+            state["T_wall_cooled"] = self.T_wall_cooled
+            state["n_steps_uncooled"] = self.n_steps_uncooled
+            for name in coolant_results:
+                state[name] = getattr(self, name)
+
+        # the cached film profile is never changed in place
+        if self.film_profile is not None:
+            state["T_film_marched"] = self.T_film_marched
+            (state["film_exists"], state["rT_layers"],
+             state["T_films"]) = self.film_profile
+
+        return state
+
+    def set_state(self, state):
+        """Restores a state returned by get_state().
+
+        :param state:
+
+        """
+        self.segs.T = state["T"].copy()
+        self.segs.T_diff = state["T_diff"].copy()
+        self.T_film = state["T_film"]
+        if self.wall is not None:
+            self.wall.T = state["T_nodes"].copy()
+
+        if "T_wall_cooled" in state:
+            self.T_wall_cooled = state["T_wall_cooled"]
+            self.n_steps_uncooled = state["n_steps_uncooled"]
+            for name in coolant_results:
+                setattr(self, name, state[name])
+        else:
+            self.T_wall_cooled = None
+            self.n_steps_uncooled = 0
+
+        if "T_film_marched" in state:
+            self.T_film_marched = state["T_film_marched"]
+            self.film_profile = (state["film_exists"], state["rT_layers"],
+                                 state["T_films"])
+        else:
+            self.T_film_marched = None
+            self.film_profile = None
+
+    def warm_start(self, state):
+        """Starts from the wall temps. of another (usually nearby) design
+        instead of the uniform initial wall temp. States on a different axial
+        grid are interpolated onto the stations of segs, stations beyond the
+        ends of the other grid take its end values.
+
+        Only the film injection temp. is taken over from the film and coolant
+        marches, both are redone at the first step.
+
+        :param state: a state returned by get_state() (e.g. from a checkpoint)
+            or analysis_results.get_final_state()
+
+        """
+        T = numpy.asarray(state["T"], dtype=float)
+        T_diff = numpy.asarray(state["T_diff"], dtype=float)
+        if "x" in state:
+            x = numpy.asarray(state["x"], dtype=float)
+        elif len(T) == len(self.segs):
+            # checkpoints of older versions don't have the station positions
+            x = self.segs.x
+        else:
+            raise ValueError("The warm start state has " + str(len(T)) +
+                             " stations and no station positions")
+
+        self.segs.T = numpy.interp(self.segs.x, x, T)
+        self.segs.T_diff = numpy.interp(self.segs.x, x, T_diff)
+        if self.wall is not None:
+            if ("T_nodes" in state
+                    and state["T_nodes"].shape[1] == self.wall.T.shape[1]):
+                self.wall.T = numpy.column_stack([
+                    numpy.interp(self.segs.x, x, T_node)
+                    for T_node in numpy.transpose(state["T_nodes"])
+                ])
+            else:
+                self.wall.set_profile(self.segs.T + self.segs.T_diff / 2,
+                                      self.segs.T - self.segs.T_diff / 2)
+        if "T_film" in state:
+            self.T_film = state["T_film"]
+
+        self.T_wall_cooled = None
+        self.n_steps_uncooled = 0
+        self.T_film_marched = None
+        self.film_profile = None
+
+    def step_adaptive(self, time_step, tol, time_step_min, time_step_max):
+        """Advances the wall by one step of at most time_step, shrinking the
+        step until its local error is below tol (K).
+
+        The local error is estimated by step doubling: the step is taken once
+        in full and once as two halves, and the more accurate two-half result
+        is kept.
+
+        Returns the time step taken and the suggested next time step.
+
+        :param time_step:
+        :param tol:
+        :param time_step_min:
+        :param time_step_max:
+
+        """
+        if self.integrator == "cn":
+            order = 2
+        else:
+            order = 1
+
+        while True:
+            state = self.get_state()
+            self.step(time_step)
+            T_full = self.segs.T.copy()
+
+            self.set_state(state)
+            self.step(time_step / 2)
+            self.step(time_step / 2)
+
+            error = numpy.max(numpy.abs(self.segs.T - T_full))
+            if error == 0:
+                factor = 2
+            else:
+                factor = min(2, max(0.2,
+                                    0.9 * (tol / error)**(1 / (order + 1))))
+
+            if error <= tol or time_step <= time_step_min:
+                time_step_next = min(max(time_step * factor, time_step_min),
+                                     time_step_max)
+                return time_step, time_step_next
+
+            self.set_state(state)
+            time_step = max(time_step * factor, time_step_min)
+
+    def solve_steady(self, tol=0.01, max_iter=1000, relax=0.7):
+        """Solves directly for the steady-state wall and coolant temperatures.
+
+        Each fixed-point iteration evaluates the gas-side coefficients and the
+        coolant march at the current wall temperatures and then solves the
+        steady heat balance of the whole wall as one tridiagonal system. The
+        heat flows stored afterwards (Q_in, Q_out) are in W, i.e. the same as
+        one step of 1 s.
+
+        Returns the number of iterations used, or None if the wall
+        temperatures did not settle within tol (K) in max_iter iterations.
+
+        :param tol:  (Default value = 0.01)
+        :param max_iter:  (Default value = 1000)
+        :param relax: under-relaxation factor (Default value = 0.7)
+
+        """
+        segs = self.segs
+
+        for i_iter in range(1, max_iter + 1):
+            T_prev = segs.T.copy()
+            if self.wall is not None:
+                T_nodes_prev = self.wall.T.copy()
+
+            self.heat_gas_side()
+            self.cool(1)
+            self.heat_film_mixing()
+            Q_in, Q_out = self.update_wall_linear(None)
+
+            if self.wall is not None:
+                self.wall.T = T_nodes_prev + relax * (self.wall.T -
+                                                      T_nodes_prev)
+                self.set_wall_surface_temps(self.T_effective,
+                                            self.get_T_clt_in())
+            else:
+                segs.T = T_prev + relax * (segs.T - T_prev)
+
+                if not self.mdot_clt == 0:
+                    segs.T_diff = (Q_in -
+                                   Q_out) * segs.get_thermal_resistance()
+
+            self.Q_in = Q_in
+            self.Q_out = Q_out
+            self.Q_in_per_area = Q_in / segs.A_chm
+            self.time_step = 1
+
+            if numpy.max(numpy.abs(segs.T - T_prev)) < tol:
+                return i_iter
+
+        return None
@@ -47,6 +47,38 @@ class entry:
             return 0
 
 
+def is_probe_list(text):
+    """Checks if text is a "Probe Locations" input value.
+
+    :param text:
+
+    """
+    for probe in text.split(","):
+        if probe in ["throat", "film"]:
+            continue
+        try:
+            float(probe)
+        except ValueError:
+            return False
+    return True
+
+
+def is_film_inject_list(text):
+    """Checks if text is a "More Film Injectors" input value.
+
+    :param text:
+
+    """
+    for film_inject in text.split(","):
+        try:
+            L_filmInject, mdot_filmInject = film_inject.split(":")
+            float(L_filmInject)
+            float(mdot_filmInject)
+        except ValueError:
+            return False
+    return True
+
+
 def focus_next_widget(event):
     """
 
@@ -134,8 +166,15 @@ def export_file():
 
     with open(save_filename, "w") as cf:
         for entry in entries:
+            # keep optional string inputs empty instead of writing a 0 that
+            # would be read back as the string "0.0"
+            if entry.unit_type == "string":
+                value = entry.entry_field.get("1.0", "end-1c")
+            else:
+                value = entry.get_value()
+
             cf.write(
-                str(entry.entry_label) + " " + str(entry.get_value()) + " " +
+                str(entry.entry_label) + " " + str(value) + " " +
                 str(entry.unit_field.get()) + "\n")
 
 
@@ -152,7 +191,8 @@ def import_file():
     import_lines = import_file.readlines()
     import_file.close()
 
-    for n_line in range(len(entries)):
+    # design files from older versions may not have the newer (optional) inputs
+    for n_line in range(min(len(entries), len(import_lines))):
         line = import_lines[n_line]
         line = line[:-1]
         line = line.split(" ")
@@ -166,9 +206,9 @@ def import_file():
                     pass
 
                 if cval == "":
-                    if (element == "SS" or element == "CCZ"
-                            or element == "Jet_A1" or element == "bell"
-                            or element == "conic"):
+                    if (element in string_values or is_probe_list(element)
+                            or is_film_inject_list(element)
+                            or element.endswith(".npz")):
                         cval = element
 
                 text_entries[n_line].delete("1.0", "end")
@@ -178,8 +218,12 @@ def import_file():
                 entry_unit_vars[n_line].set(element)
 
 
-def start_analysis():
-    """ """
+def start_analysis(resume=False):
+    """
+
+    :param resume:  (Default value = False)
+
+    """
     global material_unit, no_unit, length_units, angle_units, mass_flow_units, pressure_units, temperature_units, velocity_units, conductivity_units, molecular_mass_units, viscosity_units, time_units
 
     params = []
@@ -215,7 +259,16 @@ def start_analysis():
 
         params.append(converted_value)
 
-    analysis.perform(params)
+    if resume:
+        # continue from the checkpoint in the output folder of this design
+        design_filename = filename_field.get("1.0", "end-1c")
+        if not design_filename.endswith(".lpre"):
+            design_filename = design_filename + ".lpre"
+        restart_filename = (analysis.get_folder_name(design_filename) +
+                            "/checkpoint.npz")
+        analysis.perform(params, design_filename, True, restart_filename)
+    else:
+        analysis.perform(params)
 
 
 print("Please don't close this window while working with LETALIS.")
@@ -226,6 +279,13 @@ mw.iconbitmap("icon.ico")
 
 material_unit = ["[Material]"]
 nozzle_type_unit = ["[NozzleType]"]
+integrator_unit = ["[Integrator]"]
+analysis_mode_unit = ["[AnalysisMode]"]
+probe_unit = ["[m/'throat'/'film']"]
+film_inject_unit = ["[m:kg/s]"]
+snapshot_store_unit = ["[SnapshotStore]"]
+kernel_backend_unit = ["[KernelBackend]"]
+warm_start_unit = ["[File]"]
 no_unit = ["# (unitless)"]
 percentage_unit = ["%"]
 length_units = ["mm", "cm", "m", "km"]
@@ -239,6 +299,12 @@ molecular_mass_units = ["g/mol", "kg/kmol"]
 viscosity_units = ["millipoise", "kg/(m*s)"]
 time_units = ["s", "min", "hr"]
 
+# values that string inputs are allowed to take in design files
+string_values = [
+    "SS", "CCZ", "Jet_A1", "bell", "conic", "explicit", "implicit", "cn",
+    "transient", "steady", "memory", "disk", "python", "numba"
+]
+
 import_button = tk.Button(mw,
                           text="Import Design",
                           width=15,
@@ -268,6 +334,12 @@ analyze_button = tk.Button(
 )
 analyze_button.grid(row=0, column=6, columnspan=3, rowspan=3)
 
+resume_button = tk.Button(mw,
+                          text="Resume Analysis",
+                          width=15,
+                          command=lambda: start_analysis(resume=True))
+resume_button.grid(row=2, column=0, sticky="w")
+
 about_button = tk.Button(mw, text="About", command=show_about)
 about_button.grid(row=0, column=3, columnspan=3, rowspan=2)
 
@@ -275,7 +347,7 @@ hsep1 = ttk.Separator(mw, orient="horizontal")
 hsep1.place(x=0, y=60, relwidth=1, relheight=0.2)
 
 inputs_label = tk.Label(mw, text="DESIGN PARAMETERS", font=("Arial", 13))
-inputs_label.grid(row=3, column=0, columnspan=9)
+inputs_label.grid(row=3, column=0, columnspan=15)
 
 create_label("Thrust Chamber Geometry")
 create_entry("Engine Length", length_units, "float")
@@ -338,5 +410,56 @@ create_label("Analysis Setup")
 create_entry("Analysis Vertical Fineness", no_unit, "int")
 create_entry("Analysis End Time", time_units, "float")
 create_entry("Time Steps", time_units, "float")
+create_entry("Time Integrator: 'explicit', 'implicit' or 'cn'",
+             integrator_unit, "string")
+create_entry("Analysis Mode: 'transient' or 'steady'", analysis_mode_unit,
+             "string")
+abs_column += 1
+N_entries = 0
+
+create_label("Solver Options (optional)")
+create_entry("Steady State Tolerance (K/s, optional)", no_unit, "float")
+create_entry("Adaptive Time Step Tolerance (K, optional)", no_unit, "float")
+create_entry("Min. Time Step (optional)", time_units, "float")
+create_entry("Max. Time Step (optional)", time_units, "float")
+
+create_label("Recording (optional)")
+create_entry("Snapshot Interval (optional)", time_units, "float")
+create_entry("Probe Locations (m, comma separated)", probe_unit, "string")
+create_entry("Probe Sample Interval (optional)", time_units, "float")
+create_entry("Snapshot Store: 'memory' or 'disk'", snapshot_store_unit,
+             "string")
+create_entry("Checkpoint Interval (real time, optional)", time_units, "float")
+
+create_label("Performance (optional)")
+create_entry("Film March Tolerance (K, optional)", no_unit, "float")
+create_entry("Coolant March Interval (steps, optional)", no_unit, "int")
+create_entry("Coolant March Tolerance (K, optional)", no_unit, "float")
+create_entry("Kernel Backend: 'python' or 'numba'", kernel_backend_unit,
+             "string")
+create_entry("Warm Start Checkpoint (.npz, optional)", warm_start_unit,
+             "string")
+abs_column += 1
+N_entries = 0
+
+create_label("Mesh and Wall (optional)")
+create_entry("Throat Mesh Grading (max./min. spacing, optional)", no_unit,
+             "float")
+create_entry("Mesh Refinement Levels (optional)", no_unit, "int")
+create_entry("Mesh Refinement Tolerance (relative, optional)", no_unit,
+             "float")
+create_entry("Radial Wall Nodes (optional, 1 or at least 3)", no_unit, "int")
+create_entry("Outer Shell Thickness (optional)", length_units, "float")
+
+# (in the order of the analysis inputs, so these come last)
+create_label("Recording and Performance (optional)")
+create_entry("Snapshot Every N Steps (optional, instead of the interval)",
+             no_unit, "int")
+create_entry("Result Cache (1 to reuse results from ./cache, optional)",
+             no_unit, "int")
+
+create_label("More Film Cooling (optional)")
+create_entry("More Film Injectors (position:mass flow, comma separated)",
+             film_inject_unit, "string")
 
 mw.mainloop()
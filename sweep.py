@@ -0,0 +1,262 @@
+# - - - - - - - - - - - - - - - - - - - -
+# PARAMETER SWEEPS
+# - - - - - - - - - - - - - - - - - - - -
+# Runs many design variants on all cores
+# (without plotting) and collects a short
+# summary of every run into one table.
+#
+# python sweep.py base.lpre --set mdot_clt=0.8:1.2:5 --set n_cochan=30,40
+# python sweep.py designs/ --workers 8
+# - - - - - - - - - - - - - - - - - - - -
+import argparse
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+import numpy
+
+from analysis import analyze
+from cache import result_cache
+from config import int_params
+from config import param_names
+from config import read_config_file
+from config import string_params
+
+# summary of a run: (name, column label)
+summary_columns = [
+    ("T_wall_max", "max. wall temp. (C)"),
+    ("T_clt_out", "coolant outlet temp. (C)"),
+    ("press_drop", "total coolant press. drop (Pa)"),
+    ("m_engine", "engine mass (kg)"),
+    ("time_steady", "steady state at (s)"),
+    ("n_stations", "stations"),
+]
+
+
+def parse_sweep_values(name, text):
+    """Turns the values of a swept input into a list. The values are given
+    in the units the analysis works with, either as a comma separated list
+    or as 'start:stop:count' (evenly spaced, including stop).
+
+    :param name: input name (see config.param_names)
+    :param text:
+
+    """
+    if name not in param_names:
+        raise ValueError("Unknown analysis input '" + name + "'")
+
+    if name in string_params:
+        return [value.strip() for value in text.split(",")]
+
+    if ":" in text:
+        start, stop, count = text.split(":")
+        values = numpy.linspace(float(start), float(stop), int(count)).tolist()
+    else:
+        values = [float(value) for value in text.split(",")]
+
+    if name in int_params:
+        values = [int(round(value)) for value in values]
+
+    return values
+
+
+def get_sweep_variants(base_config, sweeps, base_name="run"):
+    """Returns a (name, analysis_config) variant of base_config for every
+    combination of the swept input values.
+
+    :param base_config: analysis_config
+    :param sweeps: list of (input name, list of values)
+    :param base_name:  (Default value = "run")
+
+    """
+    names = [name for name, values in sweeps]
+    variants = []
+    for values in itertools.product(*[values for name, values in sweeps]):
+        config = copy.copy(base_config)
+        run_name = base_name
+        for name, value in zip(names, values):
+            setattr(config, name, value)
+            run_name += "_" + name + "=" + str(value)
+        variants.append((run_name, config))
+
+    return variants
+
+
+def get_folder_variants(folder_name):
+    """Returns a (name, analysis_config) variant for every design file
+    (.lpre) in a folder.
+
+    :param folder_name:
+
+    """
+    variants = []
+    for filename in sorted(os.listdir(folder_name)):
+        if filename.endswith(".lpre"):
+            variants.append(
+                (filename[:-len(".lpre")],
+                 read_config_file(os.path.join(folder_name, filename))))
+
+    return variants
+
+
+def get_run_summary(results):
+    """Returns the summary of an analysis_results as a dict (see
+    summary_columns).
+
+    :param results:
+
+    """
+    # the coolant flows from the nozzle exit manifold to the injector face,
+    # so it leaves the channels at the first station
+    return {
+        "T_wall_max": float(results.get("cylinder_temps_in").max()),
+        "T_clt_out": float(results.get("coolant_temps")[-1][0]),
+        "press_drop": float(results.get("total_clt_press_drops")[-1]),
+        "m_engine": results.m_engine,
+        "time_steady": results.time_steady,
+        "n_stations": len(results.xs),
+    }
+
+
+def run_variant(name, config, folder_name, cache_folder=None):
+    """Runs one variant and returns (name, summary, error). Runs that fail
+    return their error message instead of a summary, so that the rest of
+    the sweep can go on.
+
+    :param name:
+    :param config:
+    :param folder_name: output folder of the run (checkpoints, disk snapshots)
+    :param cache_folder: result_cache folder shared by the runs (Default value = None)
+
+    """
+    cache = result_cache(cache_folder) if cache_folder else None
+    try:
+        results = analyze(config, folder_name, cache=cache)
+    except Exception as error:
+        # any failure only loses this variant, not the whole sweep
+        return name, None, type(error).__name__ + ": " + str(error)
+
+    return name, get_run_summary(results), None
+
+
+def run_sweep(variants,
+              n_workers=None,
+              folder_name="sweep",
+              verbose=True,
+              cache_folder=None):
+    """Runs the variants on a pool of n_workers processes (one per core by
+    default) and returns their (name, summary, error) in the order of
+    variants.
+
+    :param variants: list of (name, analysis_config)
+    :param n_workers:  (Default value = None)
+    :param folder_name: folder the runs write their files into (Default value = "sweep")
+    :param verbose: print every finished run (Default value = True)
+    :param cache_folder: result_cache folder, runs that were done before are
+        not run again and variants that only differ in later inputs share
+        their geometry (Default value = None)
+
+    """
+    rows = [None] * len(variants)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = {
+            executor.submit(run_variant, name, config,
+                            os.path.join(folder_name, name), cache_folder): i
+            for i, (name, config) in enumerate(variants)
+        }
+
+        for n_done, future in enumerate(as_completed(futures), 1):
+            rows[futures[future]] = future.result()
+            if verbose:
+                name, summary, error = future.result()
+                status = "ERROR: " + error if error else "done"
+                print("[" + str(n_done) + "/" + str(len(variants)) + "] " +
+                      name + ": " + status)
+
+    return rows
+
+
+def write_sweep_table(filename, variants, rows, swept_names=()):
+    """Writes the summaries of a sweep into a .csv file, one line per run.
+
+    :param filename:
+    :param variants: list of (name, analysis_config)
+    :param rows: list of (name, summary, error) as returned by run_sweep()
+    :param swept_names: inputs to add a column for (Default value = ())
+
+    """
+    with open(filename, "w") as f:
+        f.write("run")
+        for name in swept_names:
+            f.write(", " + name)
+        for name, label in summary_columns:
+            f.write(", " + label)
+        f.write(", error\n")
+
+        for (run_name, config), (_, summary, error) in zip(variants, rows):
+            f.write(run_name)
+            for name in swept_names:
+                f.write(", " + str(getattr(config, name)))
+            for name, label in summary_columns:
+                if summary is None or summary[name] is None:
+                    f.write(", ")
+                else:
+                    f.write(", " + str(summary[name]))
+            f.write(", " + (error or "").replace(",", ";") + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs a parameter sweep of thermal analyses.")
+    parser.add_argument(
+        "design",
+        help="base design file (.lpre) or a folder of design files")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUES",
+        help="swept input (see config.param_names) in analysis units (m, K, "
+        "Pa, kg/s, s...), as a comma separated list or start:stop:count",
+    )
+    parser.add_argument("--workers",
+                        type=int,
+                        default=None,
+                        help="number of processes (default: number of cores)")
+    parser.add_argument("--cache",
+                        default=None,
+                        metavar="FOLDER",
+                        help="keep the results in a cache folder and reuse "
+                        "them in later sweeps")
+    parser.add_argument("--out",
+                        default="sweep",
+                        help="output folder (default: sweep)")
+    args = parser.parse_args()
+
+    try:
+        if os.path.isdir(args.design):
+            variants = get_folder_variants(args.design)
+            sweeps = []
+        else:
+            sweeps = []
+            for text in args.set:
+                name, values = text.split("=", 1)
+                sweeps.append((name, parse_sweep_values(name, values)))
+            base_name = os.path.basename(args.design).split(".")[0]
+            variants = get_sweep_variants(read_config_file(args.design),
+                                          sweeps, base_name)
+    except ValueError as error:
+        print("ERROR: " + str(error))
+        quit()
+
+    print("Running", len(variants), "analyses...")
+    rows = run_sweep(variants, args.workers, args.out, cache_folder=args.cache)
+
+    if not os.path.exists(args.out):
+        os.makedirs(args.out)
+    table_filename = os.path.join(args.out, "summary.csv")
+    write_sweep_table(table_filename, variants, rows,
+                      [name for name, values in sweeps])
+    print("Summary written to", table_filename)
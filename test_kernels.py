@@ -0,0 +1,96 @@
+# - - - - - - - - - - - - - - - - - - - -
+# KERNEL BACKEND TESTS
+# - - - - - - - - - - - - - - - - - - - -
+# Checks that every kernel backend gives
+# the same results as the python one.
+#
+# python -m pytest test_kernels.py
+# - - - - - - - - - - - - - - - - - - - -
+import numpy
+import pytest
+
+from analysis import analyze
+from config import config_from_params
+from kernels import get_compiled, solve_banded_kernel
+from material import Jet_A1
+
+# a small regen cooled engine (inputs in the order of config.param_names)
+design_params = [
+    0.3, 0.1, 0.05, 0.1, 30, 0.03, "conic", 15, 0.01, 0.03, 0, 0, 0, 40,
+    0.001, 0.002, 0.003, 0, 0, 0, 0, 2.0, 2e6, 3000, 1700, 0.5, 22, 300, 1.0,
+    1.2, 1.0, 1.2, "CCZ", "SS", "Jet_A1", 1.0, 300, 4e6, 30, 0.2, 0.002
+]
+
+compared_quantities = [
+    "cylinder_temps",
+    "cylinder_temps_in",
+    "coolant_temps",
+    "coolant_presses",
+]
+
+
+def get_results(kernel_backend, **values):
+    """Runs the test design with a kernel backend.
+
+    :param kernel_backend:
+    :param values: other input name -> value
+
+    """
+    config = config_from_params(design_params)
+    config.kernel_backend = kernel_backend
+    config.sample_interval = 0.05
+    for name, value in values.items():
+        setattr(config, name, value)
+    return analyze(config)
+
+
+@pytest.mark.parametrize("values", [{}, {
+    "time_integrator": "implicit"
+}, {
+    "wall_nodes": 4
+}])
+def test_numba_backend_matches_python(values):
+    pytest.importorskip("numba")
+
+    expected = get_results("python", **values)
+    results = get_results("numba", **values)
+
+    for name in compared_quantities:
+        numpy.testing.assert_allclose(results.get(name),
+                                      expected.get(name),
+                                      rtol=1e-9,
+                                      err_msg=name)
+
+
+def test_numba_kernel_properties_match_python():
+    pytest.importorskip("numba")
+
+    temps = numpy.linspace(250, 600, 8)
+    for prop in Jet_A1().get_kernel_properties():
+        compiled_prop = get_compiled(prop)
+        numpy.testing.assert_allclose([compiled_prop(t) for t in temps],
+                                      [prop(t) for t in temps],
+                                      rtol=1e-12,
+                                      err_msg=prop.__name__)
+
+
+def test_solve_banded_kernel():
+    rng = numpy.random.default_rng(0)
+    n, w = 12, 3
+
+    # diagonally dominant, like the heat balances it solves
+    matrix = numpy.zeros((n, n))
+    for i in range(n):
+        for j in range(max(0, i - w), min(n, i + w + 1)):
+            matrix[i, j] = -rng.random()
+        matrix[i, i] = 1 - matrix[i].sum()
+    rhs = rng.random(n)
+
+    bands = numpy.zeros((n, 2 * w + 1))
+    for i in range(n):
+        for j in range(max(0, i - w), min(n, i + w + 1)):
+            bands[i, w + j - i] = matrix[i, j]
+    x = numpy.zeros(n)
+    solve_banded_kernel(bands.tolist(), rhs.tolist(), w, x)
+
+    numpy.testing.assert_allclose(x, numpy.linalg.solve(matrix, rhs))
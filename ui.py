@@ -1,4 +1,5 @@
 import os
+from time import monotonic
 
 def clear_cmd_terminal():
     if os.name == "nt":
@@ -25,3 +26,60 @@ def generate_progress_bar(percent, text=True, width=20):
         ret_str += " " + str(percent) + "%"
 
     return ret_str
+
+class progress_event:
+    """State of a running analysis, passed to progress callbacks."""
+
+    def __init__(self, step, time, time_end, eta, T_max, done=False):
+        self.step = step  # number of time steps taken
+        self.time = time  # s, analysis time
+        self.time_end = time_end  # s
+        if time_end <= 0:
+            self.percent = 100.0
+        else:
+            self.percent = min(100.0, (time / time_end) * 100)
+        self.eta = eta  # s, estimated real time left (None if unknown)
+        self.T_max = T_max  # K, max. wall temperature
+        self.done = done
+
+class progress_reporter:
+    """Calls a progress callback at most once every `interval` seconds (real
+    time), and once more when the analysis is done."""
+
+    def __init__(self, callback, interval=0.5):
+        self.callback = callback
+        self.interval = interval
+        self.t_start = None
+        self.time_start = None
+        self.t_last = None
+
+    def report(self, step, time, time_end, T, done=False):
+        t_now = monotonic()
+        if self.t_start is None:
+            # a resumed analysis doesn't start at time = 0
+            self.t_start = t_now
+            self.time_start = time
+
+        if not done and self.t_last is not None and t_now - self.t_last < self.interval:
+            return
+        self.t_last = t_now
+
+        # estimate the remaining real time from the rate so far
+        eta = None
+        if time > self.time_start:
+            eta = (t_now - self.t_start) * (time_end - time) / (time - self.time_start)
+
+        self.callback(progress_event(step, time, time_end, eta, T.max(), done))
+
+def print_progress(event):
+    # redraw a single line instead of clearing the terminal (which starts a
+    # new process every time)
+    line = "Current analysis: " + generate_progress_bar(event.percent)
+    if event.eta is not None:
+        line += " ETA: " + str(round(event.eta)) + " s"
+    line += " Max. wall temp.: " + str(round(event.T_max - 273)) + " C"
+
+    if event.done:
+        print("\r" + line)
+    else:
+        print("\r" + line, end="", flush=True)